@@ -16,11 +16,13 @@
 #   - ech_physiques[int] : Physical exchanges (MW) (Balance of physical exchanges with neighboring regions. Exporter if negative, importer if positive.)
 
 import streamlit as st
-from utils import load_data
+from utils import get_date_range, get_load_status, load_in_background
 import time
 
 before_load = time.time()
-df, df_by_day = load_data()
+# Home only needs the manifest, the dataset loads while the visitor reads
+first_date, last_date = get_date_range()
+load_in_background()
 
 if time.time() - before_load > 2:
     st.balloons()
@@ -32,7 +34,9 @@ st.caption("""
             Document by [Elliot MAISL](https://linkedin.com/in/emaisl), M1 DE2. 2023.
             """)
 
-st.write('Date range: ', df['date'].min().strftime('%d/%m/%Y'), ' - ', df['date'].max().strftime('%d/%m/%Y'))
+st.write('Date range: ', first_date.strftime('%d/%m/%Y'), ' - ', last_date.strftime('%d/%m/%Y'))
+status = get_load_status()
+st.caption(f"Data version: {status['version'] or '-'} ({status['state']})")
 
 st.markdown("""
             ## How to explain the French position against the recent German decision to close nuclear power plants?
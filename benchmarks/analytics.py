@@ -0,0 +1,92 @@
+# Peak-demand statistics (load_analytics) of every (region, year) against the same statistics in plain pandas:
+# sort_values for the load-duration curve and the percentiles, nlargest for the peaks, rolling('24h'/'7d').max()
+# and a comparison for the share above a threshold. Both start from the quarter-hours of the dataset, the results
+# are checked to be the same. The query cache is off.
+#
+#   python -m benchmarks.analytics --data-dir /tmp/eco2mix-1x --backend partitions
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pandas_profile(curve, threshold):
+    duration = curve.sort_values(ascending=False, ignore_index=True)
+    return {
+        'duration': duration,
+        'percentiles': curve.quantile([0.5, 0.9, 0.95, 0.99, 0.999]),
+        'peaks': curve.nlargest(10),
+        'rolling': {window: curve.rolling(window).max() for window in ['24h', '7d']},
+        'share': (curve > threshold).mean(),
+    }
+
+
+def numpy_profile(load_analytics, version, region, year, threshold):
+    profile = load_analytics.get_load_profile(version, region, year)
+    return profile, profile.hours_above(threshold)[1], profile.top_peaks(10)
+
+
+def same(profile, share, peaks, expected):
+    return (
+        np.allclose(profile.percentiles.iloc[:5].to_numpy(), expected['percentiles'].to_numpy())
+        and np.allclose(profile.duration_curve['consommation'], expected['duration'].iloc[
+            ((profile.duration_curve.index.to_numpy() * 4).round() - 1).astype(int)])
+        and np.allclose(peaks['consommation'], expected['peaks'].to_numpy())
+        and all(np.allclose(profile.rolling[window], expected['rolling'][window]) for window in ['24h', '7d'])
+        and np.isclose(share, expected['share'])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--backend', default='pandas', choices=['pandas', 'duckdb', 'partitions'])
+    args = parser.parse_args()
+
+    os.chdir(args.data_dir)
+    sys.path.insert(0, root)
+    import eco2mix
+    import load_analytics
+
+    eco2mix.profiling.enabled = False
+    eco2mix.query_cache.use(None)
+    eco2mix.backend = args.backend
+    version = eco2mix.load_data()
+    dataset = eco2mix.get_dataset(version)
+
+    numpy_ms, pandas_ms, curve_ms, mismatches = [], [], [], []
+    for region in eco2mix.get_region_list(version):
+        for year in eco2mix.get_year_list():
+            # Partitions are read once for both
+            if not len(dataset.load_curve(year, region)):
+                continue
+            start = time.perf_counter()
+            curve = dataset.load_curve(year, region)
+            curve_ms.append((time.perf_counter() - start) * 1000)
+            threshold = curve.mean()
+
+            start = time.perf_counter()
+            expected = pandas_profile(curve, threshold)
+            pandas_ms.append((time.perf_counter() - start) * 1000 + curve_ms[-1])
+
+            start = time.perf_counter()
+            profile, share, peaks = numpy_profile(load_analytics, version, region, year, threshold)
+            numpy_ms.append((time.perf_counter() - start) * 1000)
+
+            if not same(profile, share, peaks, expected):
+                mismatches.append((region, year))
+
+    print(f'{len(numpy_ms)} (region, year) profiles on the {args.backend} backend, {len(mismatches)} mismatches {mismatches[:5]}')
+    print(f'{"":<22}{"p50 ms":>9}{"max ms":>9}{"total s":>9}')
+    for name, ms in [('quarter-hours only', curve_ms), ('pandas', pandas_ms), ('load_analytics', numpy_ms)]:
+        print(f'{name:<22}{statistics.median(ms):>9.1f}{max(ms):>9.1f}{sum(ms) / 1000:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# Check that appending a real-time export gives the dataset a full rebuild would, on every backend: the snapshot
+# is cut at each of --cuts, the rows from the start of the day before the cut up to --end are written as an export
+# (ISO dates, integer region codes, like the real one), appended, and compared with the pandas Dataset and the
+# SqlDataset rebuilt from all the rows up to --end: frames and sort order (pandas), rows, rollup and sums of every
+# period and region, KPI summary and last_day.
+#
+# The first default cut falls inside a day, so that a partly ingested day is merged. The second one is the end of a
+# UTC day, where the snapshot keeps the first hours of the next local day pending. --end moves last_day past the
+# snapshot's, and ends in the first hour of a local day. The duckdb and partitions backends are only checked when
+# the data is a Parquet snapshot, rewritten with its partitions (fix_files.py) at every cut.
+#
+#   python -m benchmarks.append --data-dir . --cuts 2023-10-01T10:00 2023-10-03T00:00 --end 2023-10-04T22:30
+
+import argparse
+import os
+import sys
+import tempfile
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import eco2mix
+import fix_files
+from benchmarks.compact import same
+from sql_backend import SqlDataset
+
+
+def write_export(rows, path):
+    # Dates and codes formatted like the CSV export of eco2mix
+    date_heure = eco2mix.to_datetime(rows['date_heure'])
+    pd.DataFrame({
+        'code_insee_region': rows['code_insee_region'].astype(str).astype('int64'),
+        'libelle_region': rows['libelle_region'].astype(str),
+        'date': eco2mix.to_datetime(rows['date']).dt.strftime('%Y-%m-%d'),
+        'date_heure': date_heure.dt.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+        **{column: rows[column] for column in eco2mix.measure_columns},
+    }).to_csv(path, sep=';', index=False)
+
+
+def write_snapshot(rows, directory):
+    # The Parquet snapshot and its partitions, in the layout of fix_files.py
+    os.makedirs(directory)
+    rows = rows.astype({'code_insee_region': str, 'libelle_region': str}).sort_values(['code_insee_region', 'date_heure'], ignore_index=True)
+    table = pa.Table.from_pandas(rows, schema=fix_files.columnar_schema, preserve_index=False)
+    pq.write_table(table, os.path.join(directory, eco2mix.DATA_PARQUET))
+    writer = fix_files.PartitionWriter(os.path.join(directory, eco2mix.DATA_PARTITIONS))
+    writer.write(table)
+    writer.close()
+
+
+def build(rows, directory, version):
+    # The dataset of every backend, like load_dataset builds it
+    df, df_by_day = eco2mix.build_frames(rows)
+    datasets = {'pandas': eco2mix.Dataset(version, df, df_by_day, min(eco2mix.last_day, df['date'].max().date()))}
+    if pd.api.types.is_integer_dtype(rows['date_heure']):
+        write_snapshot(rows, directory)
+        datasets['partitions'] = eco2mix.PartitionedDataset(version, os.path.join(directory, eco2mix.DATA_PARTITIONS), eco2mix.last_day)
+        datasets['duckdb'] = SqlDataset(version, os.path.join(directory, eco2mix.DATA_PARQUET), eco2mix.last_day)
+    return datasets
+
+
+def sorted_by_region(index):
+    # Every region block in date order, as the binary searches of TimeIndex expect
+    return all(np.all(np.diff(index.dates[start:stop]) > 0) for start, stop in index.regions.values())
+
+
+def check(full, appended):
+    failures = []
+    if full.last_day != appended.last_day:
+        failures.append(f'last_day is {appended.last_day}, {full.last_day} in a full rebuild')
+    if isinstance(full, eco2mix.Dataset) and isinstance(appended, eco2mix.Dataset):
+        for name in ['df', 'df_by_day']:
+            if not sorted_by_region(getattr(appended, f'{name}_index')):
+                failures.append(f'{name} not sorted by (region, date)')
+        for name in ['df', 'df_by_day', 'pending_days']:
+            if not same(getattr(full, name), getattr(appended, name)):
+                failures.append(f'{name} differs from a full rebuild')
+        if str(full.df['code_insee_region'].dtype) != str(appended.df['code_insee_region'].dtype):
+            failures.append(f'code_insee_region is {appended.df["code_insee_region"].dtype}, {full.df["code_insee_region"].dtype} in a full rebuild')
+
+    periods = [(eco2mix.Period.WEEK, None), (eco2mix.Period.MONTH, None), (eco2mix.Period.ALL_TIME, None)]
+    periods += [(eco2mix.Period.YEAR, year) for year in [full.last_day.year - 1, full.last_day.year]]
+    queries = [
+        ('rows', lambda dataset, period, region: dataset.rows(period, region)),
+        ('rollup', lambda dataset, period, region: dataset.rollup(period, region).reset_index()),
+        ('sums_by_region', lambda dataset, period, region: dataset.sums_by_region(period, full.regions if region == eco2mix.Region.ALL_REGION else [region]).reset_index()),
+    ]
+    checked = 0
+    for period in periods:
+        for region in [eco2mix.Region.ALL_REGION, *full.regions]:
+            for name, query in queries:
+                checked += 1
+                if not same(query(full, period, region), query(appended, period, region)):
+                    failures.append(f'{name} {period} {region}')
+    if not np.allclose(full.kpi_summary.astype('float64'), appended.kpi_summary.reindex_like(full.kpi_summary).astype('float64')):
+        failures.append('KPI summary')
+    return checked, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--cuts', nargs='+', default=['2023-10-01T10:00', '2023-10-03T00:00'], help='UTC times the snapshot is cut at')
+    parser.add_argument('--end', default='2023-10-04T22:30', help='last UTC quarter-hour of the export')
+    args = parser.parse_args()
+    os.chdir(args.data_dir)
+    eco2mix.profiling.enabled = False
+
+    rows = eco2mix.read_eco2mix()
+    rows = rows[(eco2mix.to_datetime(rows['date_heure']) <= pd.Timestamp(args.end, tz='UTC')).to_numpy()]
+    date_heure = eco2mix.to_datetime(rows['date_heure'])
+
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as directory:
+        full = build(rows, os.path.join(directory, 'full'), 'full')
+        references = {name: full[name] for name in ['pandas', 'duckdb'] if name in full}
+        for i, cut in enumerate(pd.Timestamp(cut, tz='UTC') for cut in args.cuts):
+            path = os.path.join(directory, f'export-{i}.csv')
+            # From the start of the day before the cut, like the export
+            write_export(rows[(date_heure >= cut.floor('D') - pd.Timedelta(days=1)).to_numpy()], path)
+            export = eco2mix.read_realtime_export(path)
+
+            for backend, base in build(rows[(date_heure < cut).to_numpy()], os.path.join(directory, f'base-{i}'), 'base').items():
+                appended = base.append(export, 'appended')
+                for reference, dataset in references.items():
+                    checked, failures = check(dataset, appended)
+                    mismatches += len(failures)
+                    for failure in failures:
+                        print(f'MISMATCH {failure}')
+                    print(f'Cut at {cut}, {backend} from last_day {base.last_day} to {appended.last_day}, against {reference}: '
+                          f'{checked} queries checked, {len(failures)} mismatches')
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
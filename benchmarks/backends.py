@@ -0,0 +1,105 @@
+# Latency and memory of the query backends (eco2mix.backend) on the same snapshot: in-memory pandas, lazily loaded
+# partitions and DuckDB. Every backend runs in a fresh interpreter: load_data, then every get_* query for each
+# Period x region. cold_week_s is the first paint of a Last Week view: load_data, the KPIs and one region.
+#
+#   python -m benchmarks.synthetic --scale 1 --output-dir /tmp/eco2mix-1x
+#   python -m benchmarks.backends --data-dir /tmp/eco2mix-1x
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+backends = ['pandas', 'partitions', 'duckdb']
+
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(backend):
+    sys.path.insert(0, root)
+    import eco2mix
+    from benchmarks.suite import query_calls
+
+    eco2mix.profiling.enabled = False
+    # Every call runs its query, like a cold Streamlit cache
+    eco2mix.query_cache.use(None)
+    eco2mix.backend = backend
+
+    start = time.perf_counter()
+    version = eco2mix.load_data()
+    load_s = time.perf_counter() - start
+    loaded_rss_mb = rss_mb()
+    eco2mix.get_dataset(version).kpi_summary
+    eco2mix.get_consumption_data(version, (eco2mix.Period.WEEK, None), eco2mix.get_region_list(version)[0])
+    cold_week_s = time.perf_counter() - start
+
+    latencies = {}
+    for suite, name, period, region, call in query_calls(eco2mix, version):
+        if suite == 'query':
+            start = time.perf_counter()
+            call()
+            latencies.setdefault(name, []).append(time.perf_counter() - start)
+
+    print(json.dumps({
+        'backend': backend,
+        'dataset': type(eco2mix.get_dataset(version)).__name__,
+        'load_s': load_s,
+        'cold_week_s': cold_week_s,
+        'loaded_rss_mb': loaded_rss_mb,
+        'peak_rss_mb': peak_rss_mb(),
+        'latencies': latencies,
+    }))
+
+
+def run(backend, data_dir):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.backends', '--child', backend],
+        cwd=data_dir, env={**os.environ, 'PYTHONPATH': root, 'ECO2MIX_PROFILE': '0'},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--output', help='also write the results to a JSON file')
+    parser.add_argument('--child', choices=backends)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child)
+
+    results = [run(backend, args.data_dir) for backend in backends]
+
+    print(f'{"backend":<12}{"load (s)":>10}{"cold week (s)":>15}{"RSS after load (MB)":>21}{"peak RSS (MB)":>15}')
+    for result in results:
+        print(f'{result["backend"]:<12}{result["load_s"]:>10.2f}{result["cold_week_s"]:>15.2f}{result["loaded_rss_mb"]:>21.0f}{result["peak_rss_mb"]:>15.0f}')
+
+    print(f'\n{"query":<38}' + ''.join(f'{result["backend"] + " p50/p95 ms":>24}' for result in results))
+    for name in results[0]['latencies']:
+        cells = []
+        for result in results:
+            ms = sorted(latency * 1000 for latency in result['latencies'][name])
+            cells.append(f'{statistics.median(ms):.2f} / {ms[int(0.95 * (len(ms) - 1))]:.2f}')
+        print(f'{name:<38}' + ''.join(f'{cell:>24}' for cell in cells))
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
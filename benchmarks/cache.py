@@ -0,0 +1,90 @@
+# A long-running server under the query cache (caching.SizedCache) with different memory budgets. Every budget
+# runs in a fresh interpreter: load_data, then a seeded random sequence of get_* queries over every Period x region,
+# with the counters of the cache, the memory it holds, the RSS and the latency of the calls at the end.
+# 'unbounded' keeps every result, like st.cache_data without max_entries.
+#
+#   python -m benchmarks.cache --data-dir /tmp/eco2mix-1x --calls 3000 --budgets unbounded 256 64 16
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def child(budget, calls, seed):
+    sys.path.insert(0, root)
+    import caching
+    import eco2mix
+    from benchmarks.suite import query_calls
+
+    eco2mix.profiling.enabled = False
+    eco2mix.query_cache.use(caching.SizedCache(float('inf') if budget == 'unbounded' else float(budget)))
+    version = eco2mix.load_data()
+    loaded_rss_mb = rss_mb()
+
+    queries = [call for suite, name, period, region, call in query_calls(eco2mix, version) if suite == 'query']
+    generator = random.Random(seed)
+    latencies = []
+    for _ in range(calls):
+        call = generator.choice(queries)
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    stats = eco2mix.query_cache.stats()
+    print(json.dumps({
+        'budget': budget,
+        'cached_mb': stats['mb'].sum(),
+        'rss_growth_mb': rss_mb() - loaded_rss_mb,
+        'hits': int(stats['hits'].sum()),
+        'misses': int(stats['misses'].sum()),
+        'evictions': int(stats['evictions'].sum()),
+        'not_kept': int(stats['not_kept'].sum()),
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': sorted(latencies)[int(0.95 * (len(latencies) - 1))] * 1000,
+        'total_s': sum(latencies),
+    }))
+
+
+def run(budget, args):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.cache', '--child', budget, '--calls', str(args.calls), '--seed', str(args.seed)],
+        cwd=args.data_dir, env={**os.environ, 'PYTHONPATH': root, 'ECO2MIX_PROFILE': '0'},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--calls', type=int, default=3000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budgets', nargs='+', default=['unbounded', '256', '64', '16'], help='MB, or unbounded')
+    parser.add_argument('--child')
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.calls, args.seed)
+
+    print(f'{"budget (MB)":<13}{"cached MB":>11}{"RSS growth MB":>15}{"hits":>7}{"misses":>8}{"evictions":>11}'
+          f'{"not kept":>10}{"p50 ms":>8}{"p95 ms":>8}{"total s":>9}')
+    for budget in args.budgets:
+        result = run(budget, args)
+        print(f'{budget:<13}{result["cached_mb"]:>11.1f}{result["rss_growth_mb"]:>15.0f}{result["hits"]:>7}{result["misses"]:>8}'
+              f'{result["evictions"]:>11}{result["not_kept"]:>10}{result["p50_ms"]:>8.2f}{result["p95_ms"]:>8.2f}{result["total_s"]:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
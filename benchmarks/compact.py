@@ -0,0 +1,115 @@
+# Memory of the plain and compact (eco2mix.compact) in-memory schemas, per column, and a check that every
+# query returns the same results on both.
+#
+#   python -m benchmarks.compact --data-dir .
+
+import argparse
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import numpy as np
+import pandas as pd
+
+import eco2mix
+
+
+def plain_rows(rows):
+    # The Parquet snapshot already has the compact dtypes: widened back to those of the CSV, so that the plain
+    # side is the schema compact replaces
+    return rows.assign(
+        code_insee_region=rows['code_insee_region'].astype('int64'),
+        libelle_region=rows['libelle_region'].astype(str).astype(object),
+        **{column: rows[column].astype('float64') for column in eco2mix.measure_columns},
+    )
+
+
+def build(compact):
+    eco2mix.compact = compact
+    version = 'compact' if compact else 'plain'
+    rows = eco2mix.read_eco2mix()
+    if not compact:
+        rows = plain_rows(rows)
+    eco2mix.registry.datasets[version] = eco2mix.Dataset(version, *eco2mix.build_frames(rows), eco2mix.last_day)
+    return version
+
+
+def report(name, plain, compact):
+    merged = eco2mix.memory_report(plain).join(eco2mix.memory_report(compact), lsuffix=' plain', rsuffix=' compact')
+    merged.loc['total'] = ['', merged['bytes plain'].sum(), '', merged['bytes compact'].sum()]
+    merged['saved'] = 1 - merged['bytes compact'] / merged['bytes plain']
+    print(f'\n{name}\n{merged.to_string(formatters={"saved": "{:.0%}".format})}')
+
+
+def in_order(frame):
+    frame = frame.drop(columns='index', errors='ignore')
+    keys = [key for key in ['libelle_region', 'date', 'energy_source'] if key in frame]
+    if not keys:
+        return frame
+    # Then the values, for the rows of different regions once libelle_region is dropped (get_energy_sources_data)
+    values = [column for column in frame if column not in keys]
+    return frame.assign(**{key: frame[key].astype(str) for key in keys if key != 'date'}, **{column: frame[column].astype('float64') for column in values}) \
+        .sort_values([*keys, *values], kind='stable', ignore_index=True)
+
+
+def same(plain, compact):
+    if isinstance(plain, pd.DataFrame):
+        plain, compact = plain.reset_index(drop=True), compact.reset_index(drop=True)
+        # Regions are ordered by category code on one side and by name on the other: the rows are compared in the
+        # same order, without their positions in df (get_exchange_data)
+        plain, compact = in_order(plain), in_order(compact)
+        return list(plain.columns) == list(compact.columns) and all(same(plain[c], compact[c]) for c in plain.columns)
+    if isinstance(plain, pd.Series):
+        if pd.api.types.is_numeric_dtype(plain):
+            return len(plain) == len(compact) and np.allclose(plain.fillna(0), compact.fillna(0).astype(plain.dtype))
+        return len(plain) == len(compact) and (plain.astype(str).to_numpy() == compact.astype(str).to_numpy()).all()
+    return plain == compact
+
+
+def check(plain, compact):
+    queries = [
+        eco2mix.get_consumption_data,
+        eco2mix.get_data_for_region_and_period,
+        eco2mix.get_energy_sources_data_with_region,
+        eco2mix.get_energy_sources_data,
+        eco2mix.get_exchange_data,
+        eco2mix.get_rollup,
+        eco2mix.get_period_totals,
+        eco2mix.get_sources_by_region,
+    ]
+    dataset = eco2mix.get_dataset(plain)
+    periods = [(eco2mix.Period.WEEK, None), (eco2mix.Period.MONTH, None), (eco2mix.Period.ALL_TIME, None)]
+    periods += [(eco2mix.Period.YEAR, year) for year in sorted({date.year for date in dataset.df_by_day['date'].iloc[[0, -1]]})]
+    regions = eco2mix.get_region_list(plain)
+
+    failures = 0
+    for query in queries:
+        for period in periods:
+            for region in regions:
+                if not same(query(plain, period, region), query(compact, period, region)):
+                    failures += 1
+                    print(f'MISMATCH {query.__name__} {period} {region}')
+
+    kpis_equal = np.allclose(dataset.kpi_summary, eco2mix.get_dataset(compact).kpi_summary.reindex_like(dataset.kpi_summary))
+    print(f'\n{len(queries) * len(periods) * len(regions)} queries checked, {failures} mismatches, '
+          f'KPI summary {"identical" if kpis_equal else "DIFFERENT"}')
+    return failures == 0 and kpis_equal
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='.')
+    args = parser.parse_args()
+    os.chdir(args.data_dir)
+    eco2mix.profiling.enabled = False
+
+    plain, compact = build(False), build(True)
+    report('df', eco2mix.get_dataset(plain).df, eco2mix.get_dataset(compact).df)
+    report('df_by_day', eco2mix.get_dataset(plain).df_by_day, eco2mix.get_dataset(compact).df_by_day)
+    sys.exit(0 if check(plain, compact) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Cold, revalidated and resumed reads of the remote fallback (fetch.py) against a local stand-in for the S3 bucket.
+# The stand-in serves the CSV, a gzip copy and the Parquet snapshot of a data directory with ETag, Last-Modified,
+# ranges, a bandwidth limit, and optionally a connection dropped halfway.
+#
+#   python -m benchmarks.synthetic --scale 0.05 --csv --output-dir /tmp/eco2mix-small
+#   python -m benchmarks.fetch --data-dir /tmp/eco2mix-small --rate-mbps 100
+
+import argparse
+import email.utils
+import gzip
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import eco2mix
+import fetch
+
+
+class StandIn(http.server.ThreadingHTTPServer):
+    def __init__(self, directory, rate_mbps):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.directory = directory
+        self.rate_mbps = rate_mbps
+        # Bytes after which the next response is cut, once
+        self.interrupt_after = None
+        self.bytes_sent = 0
+
+    def url(self, name):
+        return f'http://127.0.0.1:{self.server_port}/{name}'
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = os.path.join(self.server.directory, self.path.lstrip('/'))
+        if not os.path.isfile(path):
+            return self.send_error(404)
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        if self.headers.get('If-None-Match') == etag or self.headers.get('If-Modified-Since') == last_modified:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        start = 0
+        if self.headers.get('Range') and self.headers.get('If-Range', etag) in (etag, last_modified):
+            start = int(self.headers['Range'].removeprefix('bytes=').split('-')[0])
+            if start >= stat.st_size:
+                return self.send_error(416)
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{stat.st_size - 1}/{stat.st_size}')
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(stat.st_size - start))
+        self.end_headers()
+
+        interrupt_after, self.server.interrupt_after = self.server.interrupt_after, None
+        with open(path, 'rb') as file:
+            file.seek(start)
+            sent = 0
+            while block := file.read(256 * 1024):
+                if interrupt_after is not None and sent + len(block) > interrupt_after:
+                    # Drop the connection mid-transfer
+                    self.wfile.write(block[:interrupt_after - sent])
+                    self.server.bytes_sent += interrupt_after - sent
+                    self.close_connection = True
+                    return
+                self.wfile.write(block)
+                sent += len(block)
+                self.server.bytes_sent += len(block)
+                if self.server.rate_mbps:
+                    time.sleep(len(block) * 8 / (self.server.rate_mbps * 10**6))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def timed_read(server, url, cache):
+    sent = server.bytes_sent
+    start = time.perf_counter()
+    frame = fetch.read_remote(url, directory=cache)
+    return frame, time.perf_counter() - start, (server.bytes_sent - sent) / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--rate-mbps', type=float, default=100, help='bandwidth of the stand-in, 0 for unlimited')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as served, tempfile.TemporaryDirectory() as cache:
+        shutil.copy(os.path.join(args.data_dir, eco2mix.DATA_CSV), served)
+        shutil.copy(os.path.join(args.data_dir, eco2mix.DATA_PARQUET), served)
+        with open(os.path.join(args.data_dir, eco2mix.DATA_CSV), 'rb') as source, gzip.open(os.path.join(served, eco2mix.DATA_CSV + '.gz'), 'wb', compresslevel=6) as target:
+            shutil.copyfileobj(source, target)
+
+        server = StandIn(served, args.rate_mbps)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        print(f'{"artefact":<30}{"MB":>8}{"cold (s)":>10}{"download then parse (s)":>25}{"revalidated (s)":>17}'
+              f'{"MB":>6}{"resumed (s)":>13}{"MB":>8}{"same rows":>11}')
+        for name in [eco2mix.DATA_CSV, eco2mix.DATA_CSV + '.gz', eco2mix.DATA_PARQUET]:
+            url, size_mb = server.url(name), os.path.getsize(os.path.join(served, name)) / 1024 ** 2
+
+            # Cold start, parsing while downloading (Parquet is parsed once complete)
+            shutil.rmtree(cache)
+            expected, cold_s, _ = timed_read(server, url, cache)
+
+            # The same transfer, then the parse of the cached copy
+            shutil.rmtree(cache)
+            start = time.perf_counter()
+            stream, entry = fetch.open_remote(url, cache)
+            with stream:
+                while stream.read(fetch.block_size):
+                    pass
+            fetch.read_remote(url, directory=cache)
+            sequential_s = time.perf_counter() - start
+
+            # Next cold start of a replica with the cache: 304
+            _, revalidated_s, revalidated_mb = timed_read(server, url, cache)
+
+            # Connection dropped halfway, then the next attempt
+            shutil.rmtree(cache)
+            server.interrupt_after = int(size_mb * 1024 ** 2 / 2)
+            try:
+                fetch.read_remote(url, directory=cache)
+            except Exception:
+                pass
+            frame, resumed_s, resumed_mb = timed_read(server, url, cache)
+            same = frame.shape == expected.shape and frame.equals(expected)
+
+            print(f'{name:<30}{size_mb:>8.1f}{cold_s:>10.2f}{sequential_s:>25.2f}{revalidated_s:>17.2f}'
+                  f'{revalidated_mb:>6.1f}{resumed_s:>13.2f}{resumed_mb:>8.1f}{str(same):>11}')
+
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# Import time of every entry point of the app, each import timed in a fresh interpreter:
+#   - eco2mix, the Streamlit-free data and query layer (batch jobs, notebooks),
+#   - utils, its Streamlit adapter,
+#   - Home and the pages: the imports at the top of the script (paid before anything is drawn) and all of its
+#     imports, including the charting libraries a page imports where it first uses them.
+#
+#   python -m benchmarks.imports --runs 5
+
+import argparse
+import ast
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+timer = '''
+import json, sys, time
+start = time.perf_counter()
+{source}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'s': elapsed, 'modules': len(sys.modules), 'streamlit': 'streamlit' in sys.modules}}))
+'''
+
+
+def script_imports(path):
+    # Source of the imports at the top of a script, and of all of its module-level imports
+    with open(path) as script:
+        body = ast.parse(script.read()).body
+    imports = [node for node in body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    top = []
+    for node in body:
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            continue
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            break
+        top.append(node)
+    return '\n'.join(map(ast.unparse, top)), '\n'.join(map(ast.unparse, imports))
+
+
+def entry_points():
+    yield 'eco2mix', 'import eco2mix', None
+    yield 'utils', 'import utils', None
+    for path in [os.path.join(root, '0_🏠_Home.py'), *sorted(glob.glob(os.path.join(root, 'pages', '*.py')))]:
+        yield os.path.splitext(os.path.basename(path))[0], *script_imports(path)
+
+
+def timed(source, runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', timer.format(source=source)], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output))
+    return statistics.median(result['s'] for result in results), results[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='also write the results to a JSON file')
+    args = parser.parse_args()
+
+    print(f'{"entry point":<20}{"top imports (s)":>17}{"all imports (s)":>17}{"modules":>9}{"streamlit":>11}')
+    results = []
+    for name, top, everything in entry_points():
+        top_s, loaded = timed(top, args.runs)
+        all_s = timed(everything, args.runs)[0] if everything and everything != top else top_s
+        results.append({'entry_point': name, 'top_s': top_s, 'all_s': all_s, 'modules': loaded['modules'], 'streamlit': loaded['streamlit']})
+        print(f'{name:<20}{top_s:>17.3f}{all_s:>17.3f}{loaded["modules"]:>9}{str(loaded["streamlit"]):>11}')
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# Cold-load benchmark of eco2mix.load_data, columnar snapshot vs CSV.
+# Every run happens in a fresh interpreter so that nothing is cached between them.
+#
+#   python -m benchmarks.load --data-dir . --runs 3
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(source):
+    sys.path.insert(0, root)
+    import eco2mix
+
+    eco2mix.profiling.enabled = False
+    eco2mix.backend = 'pandas'
+    if source == 'csv':
+        eco2mix.DATA_PARQUET = os.devnull + '.missing'
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    dataset = eco2mix.get_dataset(eco2mix.load_data())
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'source': source,
+        'rows': len(dataset.df),
+        'load_s': elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+        'import_rss_mb': rss_before,
+    }))
+
+
+def run(source, data_dir):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.load', '--child', source],
+        cwd=data_dir, env={**os.environ, 'PYTHONPATH': root},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--child', choices=['parquet', 'csv'])
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child)
+
+    print(f'{"source":<10}{"rows":>12}{"load (s)":>12}{"peak RSS (MB)":>16}{"of which imports":>18}')
+    for source in ['parquet', 'csv']:
+        if source == 'parquet' and not os.path.exists(os.path.join(args.data_dir, 'eco2mix-regional.parquet')):
+            print('parquet   skipped, run fix_files.py first')
+            continue
+
+        results = [run(source, args.data_dir) for _ in range(args.runs)]
+        print(f'{source:<10}{results[0]["rows"]:>12}'
+              f'{statistics.median(r["load_s"] for r in results):>12.3f}'
+              f'{statistics.median(r["peak_rss_mb"] for r in results):>16.1f}'
+              f'{statistics.median(r["import_rss_mb"] for r in results):>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+# Load test of the app served by a local `streamlit run`: concurrent sessions connect to its websocket like
+# browsers, and rerun random pages with random periods (make_time_period_selector) and regions, back to back or
+# after --think seconds. The other widgets keep their defaults. Every level of --sessions runs for --duration
+# seconds on the same server, so the caches warmed by a level are kept by the next one.
+#
+# Reported per level: reruns, errors (exceptions drawn by a page), throughput, p50/p95/p99 rerun latency (from the
+# rerun message to the end of the script, drawn elements included) per page and overall, and the RSS of the server
+# sampled every --interval seconds (--report writes the samples and the latencies to CSV). The sessions run in this
+# process: on a single CPU their share of it is part of the latency.
+#
+#   python -m benchmarks.loadtest --scale 0.2 --data-dir /tmp/eco2mix-load --sessions 1 4 16 --duration 60
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Labels of the widgets randomized on every page that has them
+period_label = 'Select a period'
+year_label = 'Select a year'
+region_label = 'Select a region'
+
+
+def free_port():
+    with socket.socket() as listener:
+        listener.bind(('127.0.0.1', 0))
+        return listener.getsockname()[1]
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def start_server(data_dir, port):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', os.path.join(root, '0_🏠_Home.py'),
+         '--server.headless', 'true', '--server.port', str(port), '--server.address', '127.0.0.1',
+         '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false'],
+        cwd=data_dir, env={**os.environ, 'PYTHONPATH': root, 'ECO2MIX_PROFILE': '0'},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1)
+            return server
+        except OSError:
+            if server.poll() is not None:
+                sys.exit('streamlit run exited')
+            time.sleep(0.2)
+    server.kill()
+    sys.exit('streamlit run did not start')
+
+
+class Session:
+    # One browser tab: a websocket to the server, and the widgets of every page seen in its last run
+    def __init__(self, connection, generator):
+        self.connection = connection
+        self.generator = generator
+        self.pages = None
+        self.widgets = {}
+
+    async def rerun(self, page, states):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.page_script_hash = page or ''
+        for state in states:
+            message.rerun_script.widget_states.widgets.append(state)
+        start = time.perf_counter()
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+
+        widgets, error = {}, None
+        while True:
+            payload = await self.connection.read_message()
+            if payload is None:
+                raise ConnectionError('the server closed the websocket')
+            forward = ForwardMsg()
+            forward.ParseFromString(payload)
+            kind = forward.WhichOneof('type')
+            if kind == 'new_session':
+                self.pages = {app_page.page_script_hash: app_page.page_name for app_page in forward.new_session.app_pages}
+                page = page or forward.new_session.page_script_hash
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    # With the line it was raised at
+                    where = element.exception.stack_trace[-2].strip() if len(element.exception.stack_trace) > 1 else ''
+                    error = error or f'{element.exception.type}: {element.exception.message} at {where}'
+                elif element_type in ('selectbox', 'slider'):
+                    # The first widget with a label is the one of the selectors, e.g. not the year of Peak demand
+                    widgets.setdefault(getattr(element, element_type).label, (element_type, getattr(element, element_type)))
+            elif kind == 'script_finished' and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                self.widgets[page] = widgets
+                return page, time.perf_counter() - start, error
+
+    def random_states(self, page):
+        # Random period, year and region for the widgets the page drew in its last run
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        states = []
+        for label, (element_type, widget) in self.widgets.get(page, {}).items():
+            if label not in (period_label, year_label, region_label):
+                continue
+            state = WidgetState(id=widget.id)
+            if element_type == 'selectbox':
+                state.int_value = self.generator.randrange(len(widget.options))
+            else:
+                state.double_array_value.data.append(self.generator.randint(int(widget.min), int(widget.max)))
+            states.append(state)
+        return states
+
+
+async def run_session(url, seed, stop, think, results):
+    from tornado.websocket import websocket_connect
+
+    connection = await websocket_connect(url, subprotocols=['streamlit'], max_message_size=1024 ** 3)
+    session = Session(connection, random.Random(seed))
+    try:
+        # The first run opens Home and lists the pages
+        page, seconds, error = await session.rerun(None, [])
+        results.append((time.time(), session.pages[page], seconds, error))
+        while not stop.is_set():
+            page = session.generator.choice(list(session.pages))
+            page, seconds, error = await session.rerun(page, session.random_states(page))
+            results.append((time.time(), session.pages[page], seconds, error))
+            if think:
+                await asyncio.sleep(session.generator.expovariate(1 / think))
+    finally:
+        connection.close()
+
+
+async def sample_rss(pid, stop, interval, samples):
+    while not stop.is_set():
+        samples.append((time.time(), rss_mb(pid)))
+        await asyncio.sleep(interval)
+
+
+async def run_level(url, pid, sessions, args):
+    stop, results, samples = asyncio.Event(), [], []
+    sampler = asyncio.ensure_future(sample_rss(pid, stop, args.interval, samples))
+    tasks = [asyncio.ensure_future(run_session(url, args.seed * 1000 + i, stop, args.think, results)) for i in range(sessions)]
+    start = time.time()
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    # Reruns in flight when the level ends are kept, the throughput is over the time they took
+    elapsed = time.time() - start
+    await sampler
+    samples.append((time.time(), rss_mb(pid)))
+    return results, samples, elapsed
+
+
+def percentile(ms, level):
+    return ms[min(len(ms) - 1, int(level * (len(ms) - 1)))]
+
+
+def summary_row(name, results):
+    ms = sorted(seconds * 1000 for _, _, seconds, _ in results)
+    errors = sum(error is not None for _, _, _, error in results)
+    return f'  {name:<22}{len(ms):>8}{errors:>8}{statistics.median(ms):>10.0f}{percentile(ms, 0.95):>10.0f}{percentile(ms, 0.99):>10.0f}{ms[-1]:>10.0f}'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', help='data served by the app, generated at --scale if it has none, and kept')
+    parser.add_argument('--scale', type=float, default=0.2, help='size of the synthetic data relative to the real dataset')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 16], help='concurrent sessions of every level')
+    parser.add_argument('--duration', type=float, default=60, help='seconds per level')
+    parser.add_argument('--think', type=float, default=0, help='mean seconds between the reruns of a session')
+    parser.add_argument('--interval', type=float, default=1, help='seconds between RSS samples')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', help='write the reruns and the RSS samples to REPORT-reruns.csv and REPORT-rss.csv')
+    args = parser.parse_args()
+
+    sys.path.insert(0, root)
+    from benchmarks import synthetic
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='eco2mix-load-')
+    if not os.path.exists(os.path.join(data_dir, 'eco2mix-regional.parquet')):
+        print(f'Generating {args.scale:g}x in {data_dir}')
+        synthetic.write(data_dir, args.scale)
+
+    port = free_port()
+    start = time.perf_counter()
+    server = start_server(data_dir, port)
+    print(f'streamlit run on port {port}, up in {time.perf_counter() - start:.1f}s, RSS {rss_mb(server.pid):.0f} MB')
+
+    url = f'ws://127.0.0.1:{port}/_stcore/stream'
+    reruns, rss = [], []
+    try:
+        for sessions in args.sessions:
+            results, samples, elapsed = asyncio.run(run_level(url, server.pid, sessions, args))
+            reruns += [(sessions, *result) for result in results]
+            rss += [(sessions, *sample) for sample in samples]
+
+            print(f'\n{sessions} sessions, {elapsed:.0f}s: {len(results) / elapsed:.2f} reruns/s, server RSS '
+                  f'{samples[0][1]:.0f} -> {max(mb for _, mb in samples):.0f} (max) -> {samples[-1][1]:.0f} MB')
+            print(f'  {"page":<22}{"reruns":>8}{"errors":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"max ms":>10}')
+            for page in sorted({page for _, page, _, _ in results}):
+                print(summary_row(page, [result for result in results if result[1] == page]))
+            print(summary_row('all', results))
+            for error in sorted({error for _, _, _, error in results if error is not None}):
+                print(f'  error: {error}')
+    finally:
+        server.terminate()
+        server.wait()
+        if not args.data_dir:
+            shutil.rmtree(data_dir)
+
+    if args.report:
+        import pandas as pd
+
+        pd.DataFrame(reruns, columns=['sessions', 'time', 'page', 'seconds', 'error']).to_csv(f'{args.report}-reruns.csv', index=False)
+        pd.DataFrame(rss, columns=['sessions', 'time', 'rss_mb']).to_csv(f'{args.report}-rss.csv', index=False)
+
+
+if __name__ == '__main__':
+    main()
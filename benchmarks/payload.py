@@ -0,0 +1,78 @@
+# Size of the data inlined in the charts of the Consumption, Production, Exchanges and Map pages, before and after
+# downsampling (and the single layer of the Map), for every Period on all regions.
+#
+#   python -m benchmarks.synthetic --scale 1 --output-dir /tmp/eco2mix-1x
+#   python -m benchmarks.payload --data-dir /tmp/eco2mix-1x
+
+import argparse
+import json
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import pandas as pd
+
+import eco2mix
+from downsampling import downsample, payload_bytes, line_budget, area_budget, bar_budget
+
+
+def charts(version, period, region):
+    # (chart, data the page used to send, data it sends now)
+    consumption = eco2mix.get_consumption_data(version, period, region)
+    yield 'consumption line', consumption, downsample(consumption, line_budget)
+
+    production_freq = eco2mix.production_freqs[period[0]]
+    energy_mix = eco2mix.get_energy_mix(version, period, region, production_freq)
+    yield 'production line', energy_mix.total, downsample(energy_mix.total, line_budget)
+
+    # The area chart used one row per (date, source), it now has one column per source folded by Vega
+    sources = eco2mix.get_rollup(version, period, region, production_freq)[eco2mix.source_columns]
+    melt = lambda frame: frame.reset_index().melt(id_vars=['date'], var_name='energy_source', value_name='energy_value')
+    yield 'production area', melt(sources), downsample(energy_mix.stacked, area_budget)
+    # The pies used to aggregate the long format of the area chart in the browser
+    yield 'production pies', pd.concat([melt(sources), melt(sources)]), pd.concat([energy_mix.source_totals, energy_mix.group_totals])
+
+    exchanges = eco2mix.get_rollup(version, period, eco2mix.Region.ALL_REGION, eco2mix.exchanges_freqs[period[0]])[['ech_physiques']]
+    yield 'exchanges bars', exchanges, downsample(exchanges, bar_budget, 'minmax')
+
+    # The Map sent the whole table of the regions in each of its six layers, it now has one row per (region, source)
+    regions = eco2mix.get_sources_by_region(version, period, eco2mix.Region.ALL_REGION) \
+        .join(eco2mix.region_coordinates, on='libelle_region') \
+        .reset_index()
+    yield 'map columns', pd.concat([regions] * len(eco2mix.source_columns), ignore_index=True), eco2mix.get_map_data(version, period)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--output', help='also write the results to a JSON file')
+    args = parser.parse_args()
+    os.chdir(args.data_dir)
+    eco2mix.profiling.enabled = False
+
+    version = eco2mix.load_data()
+    years = sorted({date.year for date in eco2mix.get_dataset(version).date_range()})
+    periods = [(eco2mix.Period.WEEK, None), (eco2mix.Period.MONTH, None), (eco2mix.Period.YEAR, years[-1]), (eco2mix.Period.ALL_TIME, None)]
+
+    results = []
+    print(f'{"period":<20}{"chart":<18}{"rows before":>12}{"rows after":>12}{"KB before":>12}{"KB after":>12}{"saved":>8}')
+    for period in periods:
+        for chart, before, after in charts(version, period, eco2mix.Region.ALL_REGION):
+            result = {
+                'period': ' '.join(str(part) for part in period if part), 'chart': chart,
+                'rows_before': len(before), 'rows_after': len(after),
+                'bytes_before': payload_bytes(before), 'bytes_after': payload_bytes(after),
+            }
+            results.append(result)
+            print(f'{result["period"]:<20}{chart:<18}{len(before):>12}{len(after):>12}{result["bytes_before"] / 1024:>12.1f}'
+                  f'{result["bytes_after"] / 1024:>12.1f}{1 - result["bytes_after"] / result["bytes_before"]:>8.0%}')
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Latency of the requests while the dataset is replaced. Sessions (threads) call load_data and a query in a loop
+# while the source file is rewritten (touched); the next version is built in the background and swapped in, or,
+# with --blocking, by the request that first sees the change, as before. Runs on a copy of the data directory.
+#
+#   python -m benchmarks.refresh --data-dir /tmp/eco2mix-1x --sessions 4 --refreshes 2
+#   python -m benchmarks.refresh --data-dir /tmp/eco2mix-1x --sessions 4 --refreshes 2 --blocking
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def session(eco2mix, blocking, stop, latencies, versions):
+    while not stop.is_set():
+        start = time.perf_counter()
+        if blocking and eco2mix.registry.stale():
+            eco2mix.registry.build()
+        version = eco2mix.load_data()
+        eco2mix.get_consumption_data(version, (eco2mix.Period.WEEK, None), eco2mix.Region.ALL_REGION)
+        latencies.append(time.perf_counter() - start)
+        versions.add(version)
+        # The time a visitor spends reading
+        time.sleep(0.01)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--sessions', type=int, default=4)
+    parser.add_argument('--refreshes', type=int, default=2)
+    parser.add_argument('--blocking', action='store_true', help='build the next version on the request path')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='eco2mix-refresh-')
+    try:
+        for name in os.listdir(args.data_dir):
+            if name.startswith('eco2mix') and os.path.isfile(os.path.join(args.data_dir, name)):
+                shutil.copy2(os.path.join(args.data_dir, name), work_dir)
+        os.chdir(work_dir)
+        sys.path.insert(0, root)
+        import eco2mix
+
+        eco2mix.profiling.enabled = False
+        eco2mix.query_cache.use(None)
+        start = time.perf_counter()
+        eco2mix.load_data()
+        print(f'First load (blocking) {time.perf_counter() - start:.2f}s')
+
+        stop, latencies, versions = threading.Event(), [], set()
+        threads = [threading.Thread(target=session, args=(eco2mix, args.blocking, stop, latencies, versions))
+                   for _ in range(args.sessions)]
+        for thread in threads:
+            thread.start()
+
+        build_s = []
+        for _ in range(args.refreshes):
+            time.sleep(1)
+            # A new source file: the dataset is reloaded from scratch
+            os.utime(eco2mix.DATA_PARQUET if os.path.exists(eco2mix.DATA_PARQUET) else eco2mix.DATA_CSV)
+            time.sleep(0.05)
+            while eco2mix.registry.stale() or eco2mix.registry.lock.locked():
+                time.sleep(0.05)
+            build_s.append(eco2mix.get_load_status()['build_s'])
+        time.sleep(1)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        shutil.rmtree(work_dir)
+
+    ms = sorted(latency * 1000 for latency in latencies)
+    print(f'{"mode":<12}{"requests":>10}{"p50 ms":>9}{"p99 ms":>9}{"max ms":>10}{"build s":>10}{"versions":>10}')
+    print(f'{"blocking" if args.blocking else "background":<12}{len(ms):>10}{statistics.median(ms):>9.1f}'
+          f'{ms[int(0.99 * (len(ms) - 1))]:>9.1f}{ms[-1]:>10.1f}{statistics.mean(build_s):>10.2f}{len(versions):>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# Memory of concurrent sessions sharing one dataset. Every simulated session loads the dataset and keeps the
+# Month slice of a region alive, like a page would during a rerun. With --copy, every session gets its own
+# unpickled copy of the frames instead, which is what st.cache_data did with load_data.
+#
+#   python -m benchmarks.sessions --data-dir . --sessions 1 5 10 25 50
+
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import threading
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def child(counts, copy):
+    sys.path.insert(0, root)
+    import eco2mix
+
+    eco2mix.profiling.enabled = False
+    # Every call runs its query, like a cold Streamlit cache
+    eco2mix.query_cache.use(None)
+    # The shared frames of the in-memory Dataset
+    eco2mix.backend = 'pandas'
+    version = eco2mix.load_data()
+    regions = eco2mix.get_region_list(version)
+    sessions = []
+
+    def session(i):
+        dataset = eco2mix.get_dataset(version)
+        frames = pickle.loads(pickle.dumps((dataset.df, dataset.df_by_day))) if copy else (dataset.df, dataset.df_by_day)
+        view = eco2mix.get_data_for_region_and_period(version, (eco2mix.Period.MONTH, None), regions[i % len(regions)])
+        sessions.append((frames, view))
+
+    results = []
+    for count in counts:
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(len(sessions), count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results.append({'sessions': count, 'rss_mb': rss_mb()})
+
+    print(json.dumps(results))
+
+
+def run(counts, copy, data_dir):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.sessions', '--child', *(['--copy'] if copy else []), '--sessions', *map(str, counts)],
+        cwd=data_dir, env={**os.environ, 'PYTHONPATH': root},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 10, 25, 50])
+    parser.add_argument('--copy', action='store_true')
+    parser.add_argument('--child', action='store_true')
+    args = parser.parse_args()
+
+    if args.child:
+        return child(sorted(args.sessions), args.copy)
+
+    shared = run(sorted(args.sessions), False, args.data_dir)
+    copied = run(sorted(args.sessions), True, args.data_dir)
+
+    print(f'{"sessions":>10}{"shared RSS (MB)":>18}{"copied RSS (MB)":>18}')
+    for shared_result, copied_result in zip(shared, copied):
+        print(f'{shared_result["sessions"]:>10}{shared_result["rss_mb"]:>18.1f}{copied_result["rss_mb"]:>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+# Benchmark suite on synthetic data (benchmarks/synthetic.py), runs offline:
+#   - load: cold eco2mix.load_data,
+#   - query: every get_* query of eco2mix for each Period x region,
+#   - page: the data preparation of the Production, Map and Exchanges pages for each Period (x region).
+# The query cache is off, so every call is timed as a cache miss.
+# Every scale runs in a fresh interpreter. Results go to a JSON file that --compare diffs between commits.
+#
+#   python -m benchmarks.suite --scales 1 5 20 --output bench-$(git rev-parse --short HEAD).json
+#   python -m benchmarks.suite --compare bench-old.json bench-new.json
+
+import argparse
+import functools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def query_calls(eco2mix, version):
+    periods = [(eco2mix.Period.WEEK, None), (eco2mix.Period.MONTH, None), (eco2mix.Period.ALL_TIME, None)]
+    periods += [(eco2mix.Period.YEAR, year) for year in eco2mix.get_year_list(version)]
+    regions = eco2mix.get_region_list(version)
+
+    queries = [
+        eco2mix.get_data_for_region_and_period,
+        eco2mix.get_rollup,
+        eco2mix.get_period_totals,
+        eco2mix.get_sources_by_region,
+        eco2mix.get_consumption_data,
+        eco2mix.get_energy_sources_data_with_region,
+        eco2mix.get_energy_sources_data,
+        eco2mix.get_exchange_data,
+    ]
+    yield 'query', 'get_region_list', None, None, functools.partial(eco2mix.get_region_list, version)
+    for query in queries:
+        for period in periods:
+            for region in regions:
+                yield 'query', query.__name__, period, region, functools.partial(query, version, period, region)
+    for period in periods:
+        for region in regions:
+            yield 'query', 'get_energy_mix', period, region, \
+                functools.partial(eco2mix.get_energy_mix, version, period, region, eco2mix.production_freqs[period[0]])
+
+    for period in periods:
+        for region in regions:
+            yield 'page', 'production', period, region, functools.partial(production_page, eco2mix, version, period, region)
+        yield 'page', 'map', period, None, functools.partial(map_page, eco2mix, version, period)
+        yield 'page', 'exchanges', period, None, functools.partial(exchanges_page, eco2mix, version, period)
+
+
+# The data preparation of the pages, without the charts
+def production_page(eco2mix, version, period, region):
+    from downsampling import downsample, line_budget, area_budget
+
+    energy_mix = eco2mix.get_energy_mix(version, period, region, eco2mix.production_freqs[period[0]])
+    heatmap = energy_mix.by_region
+    return downsample(energy_mix.total, line_budget), downsample(energy_mix.stacked, area_budget).reset_index(), \
+        heatmap.apply(lambda x: round(x, -4)), heatmap.drop(columns=['nucleaire']).apply(lambda x: round(x, -4))
+
+
+def map_page(eco2mix, version, period):
+    return eco2mix.get_map_data(version, period)
+
+
+def exchanges_page(eco2mix, version, period):
+    from downsampling import downsample, bar_budget
+
+    return downsample(eco2mix.get_rollup(version, period, eco2mix.Region.ALL_REGION, eco2mix.exchanges_freqs[period[0]])[['ech_physiques']], bar_budget, 'minmax') \
+        .reset_index()
+
+
+def timed(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def child(scale, output):
+    sys.path.insert(0, root)
+    import eco2mix
+
+    eco2mix.profiling.enabled = False
+    eco2mix.query_cache.use(None)
+    # Comparable across commits: the in-memory Dataset, see benchmarks/backends.py for the others
+    eco2mix.backend = 'pandas'
+    results = []
+
+    load_s = timed(eco2mix.load_data)
+    version = eco2mix.load_data()
+    rows = len(eco2mix.get_dataset(version).df)
+    results.append({'suite': 'load', 'name': 'load_data', 'period': None, 'region': None, 'seconds': load_s})
+
+    for suite, name, period, region, call in query_calls(eco2mix, version):
+        results.append({
+            'suite': suite, 'name': name, 'period': ' '.join(str(part) for part in period if part) if period else None,
+            'region': region, 'seconds': timed(call),
+        })
+
+    with open(output, 'w') as output_file:
+        json.dump([{'scale': scale, 'rows': rows, **result} for result in results], output_file)
+
+
+def run(scale, data_dir, output):
+    process = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.suite', '--child', str(scale), '--output', output],
+        cwd=data_dir, env={**os.environ, 'PYTHONPATH': root, 'ECO2MIX_PROFILE': '0'},
+        capture_output=True, text=True,
+    )
+    if process.returncode:
+        sys.exit(f'{scale:g}x failed:\n{process.stderr[-2000:]}')
+    with open(output) as output_file:
+        return json.load(output_file)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(results):
+    groups = {}
+    for result in results:
+        groups.setdefault((result['scale'], result['suite'], result['name']), []).append(result)
+
+    print(f'{"scale":>6} {"rows":>11}  {"suite":<6}{"name":<38}{"calls":>6}{"p50 ms":>10}{"p95 ms":>10}{"max ms":>10}{"total ms":>11}')
+    for (scale, suite, name), group in groups.items():
+        ms = sorted(result['seconds'] * 1000 for result in group)
+        print(f'{scale:>6g} {group[0]["rows"]:>11}  {suite:<6}{name:<38}{len(ms):>6}{statistics.median(ms):>10.2f}'
+              f'{ms[int(0.95 * (len(ms) - 1))]:>10.2f}{ms[-1]:>10.2f}{sum(ms):>11.1f}')
+
+
+def compare(old_path, new_path, threshold):
+    # Total time per (scale, suite, name) on the calls both runs have
+    def totals(path):
+        with open(path) as f:
+            results = json.load(f)['results']
+        return {(r['scale'], r['suite'], r['name'], r['period'], r['region']): r['seconds'] for r in results}
+
+    old, new = totals(old_path), totals(new_path)
+    groups = {}
+    for key in old.keys() & new.keys():
+        group = groups.setdefault(key[:3], [0, 0])
+        group[0] += old[key]
+        group[1] += new[key]
+
+    regressions = 0
+    print(f'{"scale":>6}  {"suite":<6}{"name":<38}{"old ms":>12}{"new ms":>12}{"change":>9}')
+    for (scale, suite, name), (old_s, new_s) in sorted(groups.items()):
+        change = new_s / old_s - 1 if old_s else 0
+        regression = change > threshold
+        regressions += regression
+        print(f'{scale:>6g}  {suite:<6}{name:<38}{old_s * 1000:>12.1f}{new_s * 1000:>12.1f}{change:>+9.0%}{"  REGRESSION" if regression else ""}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 5, 20], help='sizes relative to the real dataset')
+    parser.add_argument('--data-dir', help='keep the generated data in DATA_DIR/<scale>x and reuse it')
+    parser.add_argument('--output', default='bench.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown reported as a regression by --compare')
+    parser.add_argument('--child', type=float)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        return child(args.child, args.output)
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    sys.path.insert(0, root)
+    from benchmarks import synthetic
+
+    base_dir = args.data_dir or tempfile.mkdtemp(prefix='eco2mix-bench-')
+    output = os.path.abspath(args.output)
+    results = []
+    try:
+        for scale in args.scales:
+            data_dir = os.path.join(base_dir, f'{scale:g}x')
+            if not os.path.exists(os.path.join(data_dir, 'eco2mix-regional.parquet')):
+                print(f'Generating {scale:g}x in {data_dir}')
+                synthetic.write(data_dir, scale)
+            print(f'Running {scale:g}x')
+            results += run(scale, data_dir, output + '.part')
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(base_dir)
+        if os.path.exists(output + '.part'):
+            os.remove(output + '.part')
+
+    with open(output, 'w') as output_file:
+        json.dump({
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results,
+        }, output_file, indent=1)
+
+    summarize(results)
+    print(f'\nSaved {len(results)} timings to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+# Synthetic eco2mix-regional data with the columns eco2mix.load_data expects: 13 regions, one row per region
+# every 15 minutes, daily and seasonal consumption and production profiles, +01:00/+02:00 offsets and
+# missing nucleaire in the regions without a nuclear plant. scale=1 spans the real dataset (2013-01-01 to
+# eco2mix.last_day, about 5M rows), larger scales extend the history backwards.
+#
+#   python -m benchmarks.synthetic --scale 1 --output-dir /tmp/eco2mix-1x --csv
+
+import argparse
+import datetime
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import eco2mix
+import fix_files
+
+real_start = datetime.date(2013, 1, 1)
+
+# code, average consumption and installed capacities (MW): nucleaire, hydraulique, eolien, solaire, thermique
+regions = {
+    'Auvergne-Rhône-Alpes': ('84', 7000, 11000, 3000, 600, 1200, 800),
+    'Bourgogne-Franche-Comté': ('27', 2300, 0, 200, 900, 500, 200),
+    'Bretagne': ('53', 2500, 0, 50, 1100, 350, 400),
+    'Centre-Val de Loire': ('24', 2100, 9000, 20, 1400, 450, 150),
+    'Corse': ('94', 250, 0, 100, 20, 200, 150),
+    'Grand Est': ('44', 5000, 8000, 900, 3700, 900, 1500),
+    'Hauts-de-France': ('32', 5500, 5000, 10, 5000, 300, 2500),
+    'Île-de-France': ('11', 8000, 0, 20, 100, 200, 1500),
+    'Normandie': ('28', 3000, 7000, 30, 1000, 200, 400),
+    'Nouvelle-Aquitaine': ('75', 4200, 5500, 300, 1600, 3000, 400),
+    'Occitanie': ('76', 4000, 2500, 1100, 1600, 2500, 300),
+    'Pays de la Loire': ('52', 3000, 0, 10, 1200, 700, 1000),
+    "Provence-Alpes-Côte d'Azur": ('93', 4800, 0, 1200, 60, 1500, 1200),
+}
+
+
+def date_range(scale):
+    end = eco2mix.last_day + datetime.timedelta(days=1)
+    return end - datetime.timedelta(days=round((end - real_start).days * scale)), end
+
+
+def paris_offsets(utc):
+    # European summer time, from the last Sunday of March to the last Sunday of October at 01:00 UTC
+    def last_sunday(year, month):
+        last = datetime.date(year, month + 1, 1) - datetime.timedelta(days=1)
+        return pd.Timestamp(last - datetime.timedelta(days=(last.weekday() - 6) % 7), tz='UTC') + pd.Timedelta(hours=1)
+
+    summer = np.zeros(len(utc), dtype=bool)
+    for year in np.unique(utc.year):
+        summer |= (utc >= last_sunday(year, 3)) & (utc < last_sunday(year, 10))
+    return np.where(summer, 2, 1)
+
+
+def generate_chunk(region, start, end, seed):
+    code, consumption, nuclear, hydro, wind, solar, thermal = regions[region]
+    rng = np.random.default_rng(seed)
+
+    utc = pd.date_range(pd.Timestamp(start, tz='UTC'), pd.Timestamp(end, tz='UTC'), freq='15min', inclusive='left')
+    offsets = paris_offsets(utc)
+    local = utc.tz_localize(None) + pd.to_timedelta(offsets, unit='h')
+
+    n = len(utc)
+    hour = local.hour.to_numpy() + local.minute.to_numpy() / 60
+    # 1 in mid-January, -1 in mid-July
+    winter = np.cos(2 * np.pi * (local.dayofyear.to_numpy() - 15) / 365.25)
+    weekend = local.dayofweek.to_numpy() >= 5
+    noise = lambda size: rng.normal(0, size, n)
+
+    daylight = 12 - 4 * winter
+    sun = np.clip(np.sin(np.pi * (hour - (12.5 - daylight / 2)) / daylight), 0, None)
+    days = (utc.asi8 // 10**9) / 86400
+
+    values = {
+        'consommation': consumption * (1 + 0.3 * winter + 0.15 * np.sin(2 * np.pi * (hour - 9) / 24) - 0.1 * weekend + noise(0.03)),
+        'thermique': thermal * np.clip(0.2 + 0.35 * winter + noise(0.05), 0, 1),
+        'nucleaire': nuclear * np.clip(0.7 + 0.15 * winter + noise(0.02), 0, 1) if nuclear else np.full(n, np.nan),
+        'eolien': wind * np.clip(0.25 + 0.1 * winter + 0.2 * np.sin(2 * np.pi * days / 3.7 + seed % 7) + noise(0.05), 0, 1),
+        'solaire': solar * sun * np.clip(0.6 - 0.25 * winter + noise(0.1), 0, 1),
+        'hydraulique': hydro * np.clip(0.45 + 0.2 * np.sin(2 * np.pi * (local.dayofyear.to_numpy() - 80) / 365.25) + 0.1 * np.sin(2 * np.pi * (hour - 12) / 24) + noise(0.05), 0, 1),
+        'bioenergies': consumption * np.clip(0.03 + noise(0.003), 0, None),
+    }
+    values = {column: np.round(value) for column, value in values.items()}
+    production = sum(np.nan_to_num(values[column]) for column in eco2mix.source_columns)
+    # Imports are positive, exports negative
+    values['ech_physiques'] = np.round(values['consommation'] - production)
+
+    return pd.DataFrame({
+        'code_insee_region': code,
+        'libelle_region': region,
+        'date': local.strftime('%Y-%m-%d'),
+        'date_heure': local.strftime('%Y-%m-%dT%H:%M:%S') + np.where(offsets == 2, '+02:00', '+01:00'),
+        **values,
+    }, columns=eco2mix.dataset_columns)
+
+
+def generate(scale=1, seed=0):
+    # Yields chunks of one region and one year, in the (code_insee_region, date_heure) order of fix_files.py
+    start, end = date_range(scale)
+    for i, region in enumerate(sorted(regions, key=lambda region: int(regions[region][0]))):
+        for year in range(start.year, end.year + 1):
+            chunk_start = max(start, datetime.date(year, 1, 1))
+            chunk_end = min(end, datetime.date(year + 1, 1, 1))
+            if chunk_start < chunk_end:
+                yield generate_chunk(region, chunk_start, chunk_end, seed=seed * 10_000 + i * 1_000 + year % 1_000)
+
+
+def write(output_dir, scale=1, csv=False, parquet=True, seed=0):
+    # Writes eco2mix-regional.parquet with its partitions (and .csv) and the manifest in output_dir and returns
+    # the number of rows
+    os.makedirs(output_dir, exist_ok=True)
+    writer = pq.ParquetWriter(os.path.join(output_dir, eco2mix.DATA_PARQUET), fix_files.columnar_schema) if parquet else None
+    partitions = fix_files.PartitionWriter(os.path.join(output_dir, eco2mix.DATA_PARTITIONS)) if parquet else None
+    csv_file = open(os.path.join(output_dir, eco2mix.DATA_CSV), 'w', newline='') if csv else None
+    manifest = fix_files.Manifest()
+
+    rows = 0
+    for chunk in generate(scale, seed):
+        table = fix_files.to_columnar(chunk.assign(key=fix_files.merge_key(chunk)))
+        manifest.add(table)
+        if writer:
+            writer.write_table(table)
+            partitions.write(table)
+        if csv_file:
+            chunk.to_csv(csv_file, index=False, header=rows == 0)
+        rows += len(chunk)
+
+    if writer:
+        writer.close()
+        partitions.close()
+    if csv_file:
+        csv_file.close()
+    manifest.write(os.path.join(output_dir, eco2mix.DATA_MANIFEST))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=float, default=1, help='size relative to the real dataset')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--csv', action='store_true', help='also write eco2mix-regional.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rows = write(args.output_dir, args.scale, csv=args.csv, seed=args.seed)
+    print(f'Wrote {rows} rows to {args.output_dir}')
+
+
+if __name__ == '__main__':
+    main()
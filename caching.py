@@ -0,0 +1,172 @@
+# Pluggable cache of the query functions of eco2mix. They are decorated once with @profiled(cache=query_cache)
+# and cached by the backend in use:
+#   - SizedCache, an in-process LRU bounded by the bytes of the results, by default (app, batch jobs, notebooks),
+#   - st.cache_data, which keeps a pickled copy of every result,
+#   - None to run the body on every call.
+# Results computed ahead of time (prewarm.py) are preloaded and served before the backend is asked, unless it is None.
+# They are held apart from the backend: ECO2MIX_CACHE_MB does not count them and they are never evicted, the
+# prewarm file bounding them. SizedCache counts the calls they serve as preloaded.
+#
+#   ECO2MIX_CACHE_MB=512 streamlit run 0_🏠_Home.py
+#   eco2mix.query_cache.stats()
+
+import functools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+# Memory budget of the results kept by SizedCache, shared by all the query functions
+budget_mb = float(os.environ.get('ECO2MIX_CACHE_MB', '256'))
+# Results computed faster than this per MB they hold are not kept: recomputing them is cheaper than the memory
+min_cost_s_per_mb = 0.01
+counter_names = ['hits', 'preloaded', 'misses', 'evictions', 'not_kept']
+
+
+def result_bytes(result):
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    if isinstance(result, pd.Series):
+        return int(result.memory_usage(deep=True))
+    if isinstance(result, (list, tuple)):
+        return sys.getsizeof(result) + sum(map(result_bytes, result))
+    if hasattr(result, '__dict__'):
+        # e.g. EnergyMix, a holder of frames
+        return sum(map(result_bytes, vars(result).values()))
+    return sys.getsizeof(result)
+
+
+class SizedCache:
+    # Results of every query function in one LRU, evicted once their bytes exceed the budget. Results are shared,
+    # not copied: with copy-on-write, a caller writing to a cached frame copies it.
+    def __init__(self, budget_mb=budget_mb):
+        self.budget = budget_mb * 1024 ** 2
+        self.entries = OrderedDict()
+        self.size = 0
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def count(self, name, counter):
+        counters = self.counters.setdefault(name, dict.fromkeys(counter_names, 0))
+        counters[counter] += 1
+
+    def count_preloaded(self, name):
+        # A call served by CachedFunction from the preloaded results, without asking the cache
+        with self.lock:
+            self.count(name, 'preloaded')
+
+    def __call__(self, func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def cached(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    self.entries.move_to_end(key)
+                    self.count(name, 'hits')
+                    return entry[0]
+                self.count(name, 'misses')
+
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            self.add(key, result, time.perf_counter() - start)
+            return result
+
+        cached.clear = functools.partial(self.clear, name)
+        return cached
+
+    def add(self, key, result, cost_s):
+        size = result_bytes(result)
+        with self.lock:
+            if size > self.budget or cost_s < min_cost_s_per_mb * size / 1024 ** 2:
+                self.count(key[0], 'not_kept')
+                return
+            if key in self.entries:
+                # Computed by another session meanwhile
+                return
+            self.entries[key] = (result, size)
+            self.size += size
+            while self.size > self.budget:
+                (name, *_), (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+                self.count(name, 'evictions')
+
+    def clear(self, name=None):
+        with self.lock:
+            for key in [key for key in self.entries if name is None or key[0] == name]:
+                self.size -= self.entries.pop(key)[1]
+
+    def stats(self):
+        # Counters, entries and MB held per function, preloaded results not included in the MB
+        with self.lock:
+            counters = pd.DataFrame.from_dict(self.counters, orient='index', dtype='int64').reindex(columns=counter_names)
+            held = pd.DataFrame([(key[0], size) for key, (_, size) in self.entries.items()], columns=['function', 'size'])
+        held = held.groupby('function')['size'].agg(entries='size', mb=lambda size: size.sum() / 1024 ** 2)
+        stats = counters.join(held, how='outer').fillna({'entries': 0, 'mb': 0})
+        stats['hit_rate'] = (stats['hits'] + stats['preloaded']) / (stats['hits'] + stats['preloaded'] + stats['misses'])
+        return stats.rename_axis('function')
+
+
+class CachedFunction:
+    # A query function, cached by the current backend of its QueryCache
+    def __init__(self, func, backend):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.preloaded = {}
+        self.use(backend)
+
+    def use(self, backend):
+        self.backend = backend
+        self.body = backend(self.func) if backend is not None else self.func
+        if backend is None:
+            self.preloaded = {}
+
+    def __call__(self, *args, **kwargs):
+        if self.preloaded and not kwargs and args in self.preloaded:
+            if hasattr(self.backend, 'count_preloaded'):
+                self.backend.count_preloaded(self.__name__)
+            return self.preloaded[args]
+        return self.body(*args, **kwargs)
+
+    def clear(self):
+        if hasattr(self.body, 'clear'):
+            self.body.clear()
+
+
+class QueryCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.functions = []
+
+    def __call__(self, func):
+        function = CachedFunction(func, self.backend)
+        self.functions.append(function)
+        return function
+
+    def use(self, backend):
+        # Replaces the cache of every function, dropping what the previous backend held
+        self.backend = backend
+        for function in self.functions:
+            function.use(backend)
+
+    def clear(self):
+        for function in self.functions:
+            function.clear()
+
+    def stats(self):
+        # Hits, preloaded results served, misses, evictions and results not kept, per function, when the backend
+        # counts them
+        return self.backend.stats() if hasattr(self.backend, 'stats') else None
+
+    def preload(self, results):
+        # results: {(function name, args): result}, replacing what was preloaded before. Without a backend every
+        # call runs its body, preloaded results included.
+        if self.backend is None:
+            results = {}
+        for function in self.functions:
+            function.preloaded = {args: result for (name, args), result in results.items() if name == function.__name__}
@@ -0,0 +1,81 @@
+# Reduces the series sent to the charts to a point budget before Streamlit/Altair inline them:
+#   - lttb keeps the points that preserve the visual shape (Largest-Triangle-Three-Buckets),
+#   - minmax keeps the lowest and highest point of every bucket, so peaks are never smoothed out.
+# Multi-series frames are downsampled on the sum of their columns, so stacked series keep the same timestamps.
+
+import numpy as np
+import pandas as pd
+
+import profiling
+from profiling import profiled
+
+# Timestamps per chart, around twice the width of a chart in pixels
+line_budget = 1500
+area_budget = 600
+bar_budget = 400
+
+
+def lttb(x, y, budget):
+    # Indices of the budget points kept: the first, the last, and in every bucket between them the point forming
+    # the largest triangle with the point kept in the previous bucket and the average of the next bucket
+    n = len(y)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+
+    # Buckets of the points between the first and the last, then the last point alone
+    starts = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    counts = np.diff(np.append(starts, n))
+    # Average point of every bucket
+    mean_x = np.add.reduceat(x, starts) / counts
+    mean_y = np.add.reduceat(y, starts) / counts
+
+    selected = np.empty(budget, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(budget - 2):
+        start, stop = starts[i], starts[i + 1]
+        area = np.abs((x[a] - mean_x[i + 1]) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (mean_y[i + 1] - y[a]))
+        a = start + area.argmax()
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(x, y, budget):
+    # Indices of the minimum and maximum of budget / 2 buckets, in order
+    n = len(y)
+    if budget >= n or budget < 2:
+        return np.arange(n)
+
+    starts = np.linspace(0, n, budget // 2 + 1).astype(np.int64)[:-1]
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    lows = np.flatnonzero(y == np.minimum.reduceat(y, starts)[bucket])
+    highs = np.flatnonzero(y == np.maximum.reduceat(y, starts)[bucket])
+    # First occurrence of the extremes of every bucket
+    lows = lows[np.unique(bucket[lows], return_index=True)[1]]
+    highs = highs[np.unique(bucket[highs], return_index=True)[1]]
+    return np.union1d(lows, highs)
+
+
+methods = {'lttb': lttb, 'minmax': minmax}
+
+
+@profiled()
+def downsample(data, budget, method='lttb'):
+    # At most budget rows of a Series or frame indexed by date, picked on the values (or the sum of the columns)
+    profiling.add_rows_in(len(data))
+    if len(data) <= budget:
+        return data
+
+    values = data if isinstance(data, pd.Series) else data.sum(axis=1)
+    y = np.nan_to_num(values.to_numpy(dtype='float64'))
+    # Seconds from the first point, so that the triangle areas stay precise
+    x = (data.index.asi8 - data.index.asi8[0]) / 1e9
+    return data.iloc[methods[method](x, y, budget)]
+
+
+def payload_bytes(data):
+    # Size of the data inlined in a Vega-Lite spec, as JSON records
+    frame = data.to_frame() if isinstance(data, pd.Series) else data
+    if not isinstance(frame.index, pd.RangeIndex):
+        frame = frame.reset_index()
+    return len(frame.to_json(orient='records', date_format='iso'))
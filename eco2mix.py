@@ -0,0 +1,1151 @@
+# Data and query layer of the app, without Streamlit: loading and refreshing the datasets, the get_* queries and
+# the selectors' lists. utils adapts it to Streamlit, batch jobs and notebooks import it directly:
+#
+#   import eco2mix
+#   version = eco2mix.load_data()
+#   eco2mix.get_consumption_data(version, (eco2mix.Period.YEAR, 2022), eco2mix.Region.ALL_REGION)
+
+import pandas as pd
+import numpy as np
+import datetime
+import json
+import os
+import pickle
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Future
+import pyarrow.parquet as pq
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
+
+import caching
+import fetch
+import profiling
+from profiling import profiled
+
+# Datasets are shared by every session without copies: with copy-on-write, the slices handed to the pages
+# are views of the shared frames, and writing to one copies it instead of modifying the dataset
+pd.set_option('mode.copy_on_write', True)
+
+
+class Period:
+    WEEK = "Last Week"
+    MONTH = "Last Month"
+    YEAR = "A Given Year"
+    ALL_TIME = "All Time"
+
+
+class Region:
+    ALL_REGION = 'All Region'
+
+
+last_day = pd.to_datetime('2023-10-05T00:00:00+00:00').date()
+
+# Columnar snapshot written by fix_files.py, the CSV stays as a fallback source
+DATA_PARQUET = 'eco2mix-regional.parquet'
+DATA_CSV = 'eco2mix-regional.csv'
+# Remote fallback, downloaded through the cache of fetch.py. Can point to a .csv.gz or .parquet artefact.
+DATA_URL = os.environ.get('ECO2MIX_DATA_URL', 'https://elliotmv.s3.fr-par.scw.cloud/eco2mix-regional.csv')
+# One Parquet file per (year, region) written by fix_files.py, loaded on demand by PartitionedDataset
+DATA_PARTITIONS = 'eco2mix-regional'
+# Date range, years, regions, row counts and column statistics of the snapshot, written by fix_files.py
+DATA_MANIFEST = 'eco2mix-regional.json'
+# Latest real-time export from data.gouv.fr: its new rows are appended to the loaded dataset, see Dataset.append
+DATA_REALTIME = 'eco2mix-regional-tr-latest.csv'
+# Results of the page queries computed ahead of time by prewarm.py for one dataset version, see read_prewarmed
+DATA_PREWARM = 'eco2mix-prewarm.pickle'
+# Changed whenever a prewarmed query returns something else, so that older files are ignored
+prewarm_format = 3
+
+measure_columns = ['consommation', 'thermique', 'nucleaire', 'eolien', 'solaire', 'hydraulique', 'bioenergies', 'ech_physiques']
+source_columns = ['thermique', 'nucleaire', 'eolien', 'solaire', 'hydraulique', 'bioenergies']
+dataset_columns = ['code_insee_region', 'libelle_region', 'date', 'date_heure', *measure_columns]
+
+# Categorical regions and the narrowest measure dtypes that hold the values, see compact_frame
+compact = os.environ.get('ECO2MIX_COMPACT', '1') == '1'
+# 'partitions' loads the partitions a query needs (PartitionedDataset, or Dataset without partitions), 'pandas'
+# keeps the whole dataset in memory (Dataset), 'duckdb' queries the Parquet snapshot (sql_backend.SqlDataset)
+backend = os.environ.get('ECO2MIX_BACKEND', 'partitions')
+# Partitions kept in memory by PartitionedDataset, least recently used first out (one region-year is ~35k rows)
+partition_cache_size = int(os.environ.get('ECO2MIX_PARTITIONS_IN_MEMORY', '64'))
+# Cache of the get_* queries, bounded by the size of the results (ECO2MIX_CACHE_MB), see caching
+query_cache = caching.QueryCache(caching.SizedCache())
+
+def read_eco2mix():
+    if os.path.exists(DATA_PARQUET):
+        return pd.read_parquet(DATA_PARQUET, columns=dataset_columns)
+
+    try:
+        return pd.read_csv(DATA_CSV)
+    except FileNotFoundError:
+        # Deployed without the local files: don't write profiles next to the app
+        profiling.enabled = False
+        return fetch.read_remote(DATA_URL)
+
+
+def to_datetime(column):
+    # The columnar snapshot stores dates as epoch seconds, the CSV as ISO strings
+    if pd.api.types.is_integer_dtype(column):
+        # Nanoseconds reinterpreted as datetimes, many times faster than pd.to_datetime(unit='s')
+        dates = pd.DatetimeIndex((column.to_numpy() * 10**9).view('datetime64[ns]')).tz_localize('UTC')
+        return pd.Series(dates, index=column.index, name=column.name)
+    return pd.to_datetime(column, utc=True)
+
+
+def compact_measure(column):
+    int32 = np.iinfo(np.int32)
+    integral = pd.api.types.is_integer_dtype(column) or (column.dropna() % 1 == 0).all()
+    if integral and int32.min <= column.min() and column.max() <= int32.max:
+        # Every query sums the measures, so a missing value counts as 0 either way
+        return column.fillna(0).astype('int32')
+
+    # float32 only while the values and their sums stay exact
+    values = column.dropna()
+    if values.abs().sum() < 2 ** 24 and (values.astype('float32') == values).all():
+        return column.astype('float32')
+    return column
+
+
+def compact_frame(frame):
+    return frame.assign(
+        **{column: frame[column].astype('category') for column in ['code_insee_region', 'libelle_region'] if column in frame},
+        **{column: compact_measure(frame[column]) for column in measure_columns if column in frame},
+    )
+
+
+def memory_report(frame):
+    return pd.DataFrame({
+        'dtype': frame.dtypes.astype(str),
+        'bytes': frame.memory_usage(deep=True, index=False),
+    })
+
+
+def day_start(day):
+    return pd.Timestamp(day, tz='UTC')
+
+
+def day_end(day):
+    return pd.Timestamp(day + datetime.timedelta(days=1), tz='UTC')
+
+
+class TimeIndex:
+    # Row offsets of every region in a frame sorted by (libelle_region, date), and the timestamps of the
+    # rows, so that region and period filters are binary searches returning views of the frame
+    def __init__(self, frame, regions=None):
+        self.dates = frame['date'].values.view('int64')
+        self.dates.flags.writeable = False
+
+        if regions is None:
+            names = frame['libelle_region'].to_numpy()
+            boundaries = np.flatnonzero(names[1:] != names[:-1]) + 1
+            starts = [0, *boundaries] if len(names) else []
+            stops = [*boundaries, len(names)]
+            regions = {names[start]: (start, stop) for start, stop in zip(starts, stops)}
+        self.regions = regions
+
+    def parts(self, frame, start=None, end=None, region=Region.ALL_REGION):
+        # One view per region of the rows in [start, end)
+        regions = self.regions.values() if region == Region.ALL_REGION else [self.regions[region]]
+        for lo, hi in regions:
+            dates = self.dates[lo:hi]
+            yield frame.iloc[
+                lo + (dates.searchsorted(start.value) if start is not None else 0):
+                lo + (dates.searchsorted(end.value) if end is not None else len(dates))
+            ]
+
+    def slice(self, frame, start=None, end=None, region=Region.ALL_REGION):
+        if region == Region.ALL_REGION and start is None and end is None:
+            return frame
+        parts = list(self.parts(frame, start, end, region))
+        return parts[0] if len(parts) == 1 else pd.concat(parts)
+
+
+def prepare_frames(df, watermarks=None, end=None):
+    # Quarter-hour rows and their daily sums, unsorted, keeping only the rows after the watermark of their region
+    # and before end
+    df = df.assign(date_heure=to_datetime(df['date_heure']))
+    if end is not None:
+        df = df[(df['date_heure'] < end).to_numpy()]
+    if watermarks:
+        watermark = pd.to_datetime(df['libelle_region'].astype(str).map(watermarks), utc=True)
+        df = df[watermark.isna() | (df['date_heure'] > watermark)]
+
+    if compact:
+        df = compact_frame(df)
+
+    df_by_day = df.drop(['date_heure'], axis=1).groupby(['code_insee_region', 'libelle_region', 'date'], observed=True).agg({
+        'consommation': 'sum',
+        'thermique': 'sum',
+        'nucleaire': 'sum',
+        'eolien': 'sum',
+        'solaire': 'sum',
+        'hydraulique': 'sum',
+        'bioenergies': 'sum',
+        'ech_physiques': 'sum',
+    }).reset_index()
+    df_by_day['date'] = to_datetime(df_by_day['date'])
+
+    df = df.drop(['date'], axis=1).rename(columns={'date_heure': 'date'})
+    return df, df_by_day
+
+
+def build_frames(df):
+    # Both frames from the quarter-hours up to the end of last_day in UTC: the daily sums then end with the first
+    # hours of the next local day, which Dataset sets aside (split_days)
+    df, df_by_day = prepare_frames(df, end=day_end(last_day))
+
+    # Sort by (region, date) so that TimeIndex can slice both frames
+    df = df.sort_values(['libelle_region', 'date'], ignore_index=True)
+    df_by_day = df_by_day.sort_values(['libelle_region', 'date'], ignore_index=True)
+
+    if compact:
+        df_by_day = compact_frame(df_by_day)
+
+    return df, df_by_day
+
+
+def concat_frames(frames):
+    # pd.concat turns categoricals into objects unless they all have the same categories
+    for column in ['code_insee_region', 'libelle_region']:
+        if all(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = frames[0][column].cat.categories
+            for frame in frames[1:]:
+                categories = categories.append(frame[column].cat.categories.difference(categories))
+            frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def split_days(df_by_day, last_day):
+    # The daily sums up to last_day, and those of the local days after it. Local days end before the UTC ones, so
+    # the quarter-hours up to the end of last_day in UTC also start the next local day: its sums are pending until
+    # the rows of the rest of that day are appended.
+    after = (df_by_day['date'] >= day_end(last_day)).to_numpy()
+    if not after.any():
+        return df_by_day, df_by_day.iloc[:0]
+    return df_by_day[~after].reset_index(drop=True), df_by_day[after].reset_index(drop=True)
+
+
+def add_pending_days(pending_days, daily_rows):
+    # Daily sums of the new rows, plus the pending sums of the same days
+    if not len(pending_days):
+        return daily_rows
+    return concat_frames([pending_days, daily_rows]) \
+        .groupby(['code_insee_region', 'libelle_region', 'date'], observed=True, as_index=False)[measure_columns] \
+        .sum()
+
+
+def code_dtype(codes):
+    # Region codes are strings in the Parquet snapshot and integers in the CSV
+    values = codes.cat.categories if isinstance(codes.dtype, pd.CategoricalDtype) else codes
+    return str if values.dtype == object else values.dtype
+
+
+def append_rows(frame, frame_index, rows):
+    # frame is sorted by (libelle_region, date) and the rows of a region start at or after its last date. Rows on
+    # that date are added to it (a day that was partly ingested), the others go after it. Only the affected tails
+    # are regrouped, and the offsets of the new TimeIndex follow from the lengths of the parts.
+    rows_by_region = dict(iter(rows.groupby('libelle_region', observed=True)))
+    regions = [*frame_index.regions, *(region for region in rows_by_region if region not in frame_index.regions)]
+
+    parts, offsets, position = [], {}, 0
+    for region in regions:
+        old = frame_index.slice(frame, region=region) if region in frame_index.regions else frame.iloc[:0]
+        region_parts = [old]
+
+        if region in rows_by_region:
+            new = rows_by_region[region].sort_values('date')
+            overlap = old['date'].searchsorted(new['date'].iloc[0])
+            if overlap < len(old):
+                new = pd.concat([old.iloc[overlap:], new]) \
+                    .groupby(['code_insee_region', 'libelle_region', 'date'], observed=True, as_index=False)[measure_columns] \
+                    .sum()
+            region_parts = [old.iloc[:overlap], new.astype({column: frame[column].dtype for column in measure_columns})]
+
+        parts += region_parts
+        length = sum(len(part) for part in region_parts)
+        offsets[region] = (position, position + length)
+        position += length
+
+    frame = concat_frames(parts)
+    return frame, TimeIndex(frame, offsets)
+
+
+# Resolutions of the rollup cube, from finest to coarsest. Week and Month views are served from the
+# quarter-hours of df, Year and All Time views from df_by_day, like get_data_for_region_and_period does.
+# The finest level of each source keeps the native timestamps, the others are pd.Grouper bins.
+rollup_levels = {
+    'raw': ['15min', '6H', 'D'],
+    'daily': ['D', 'M'],
+}
+
+
+def build_rollup_level(frame, freq, native, compacted=True):
+    if native:
+        level = frame.groupby('date')[measure_columns].sum()
+    else:
+        level = frame.groupby(pd.Grouper(key='date', freq=freq))[measure_columns].sum()
+    return compact_frame(level) if compact and compacted else level
+
+
+def build_rollup_cube(df, df_by_day, compacted=True):
+    cube = {}
+    for source, frame in [('raw', df), ('daily', df_by_day)]:
+        for i, freq in enumerate(rollup_levels[source]):
+            level = {
+                region: build_rollup_level(region_frame, freq, i == 0, compacted)
+                for region, region_frame in frame.groupby('libelle_region', observed=True)
+            }
+            level[Region.ALL_REGION] = build_rollup_level(frame, freq, i == 0, compacted)
+            cube[source, freq] = level
+    return cube
+
+
+def append_rollup(level, delta):
+    # Bins are sums, so the bins of the new rows are added to the last bins of the level or appended after them
+    if level is None or not len(level):
+        return compact_frame(delta) if compact else delta
+    if not len(delta):
+        return level
+    position = level.index.searchsorted(delta.index[0])
+    tail = level.iloc[position:].add(delta, fill_value=0).astype(level.dtypes.to_dict())
+    return pd.concat([level.iloc[:position], tail])
+
+
+def append_rollup_cube(cube, rows, daily_rows):
+    # rows and daily_rows are only the new quarter-hours and their daily sums. The deltas are cast to the
+    # dtypes of the levels they are added to, so they are not compacted on their own.
+    deltas = build_rollup_cube(rows, daily_rows, compacted=False)
+    return {
+        key: {
+            **level,
+            **{region: append_rollup(level.get(region), delta) for region, delta in deltas[key].items()},
+        }
+        for key, level in cube.items()
+    }
+
+
+def period_range(choice_period, last_day):
+    period, year = choice_period
+
+    if period == Period.WEEK:
+        return pd.Timestamp(last_day - datetime.timedelta(days=7), tz='UTC'), None
+    if period == Period.MONTH:
+        return pd.Timestamp(last_day - datetime.timedelta(days=30), tz='UTC'), None
+    if period == Period.YEAR:
+        return pd.Timestamp(year=year, month=1, day=1, tz='UTC'), pd.Timestamp(year=year + 1, month=1, day=1, tz='UTC')
+    return None, None
+
+
+def rollup_source(choice_period):
+    return 'raw' if choice_period[0] in [Period.WEEK, Period.MONTH] else 'daily'
+
+
+def frequency_divides(level, freq):
+    level, freq = to_offset(level), to_offset(freq)
+    if level == freq:
+        return True
+    if isinstance(level, Tick) and isinstance(freq, Tick):
+        return freq.nanos % level.nanos == 0
+    # Calendar frequencies (e.g. 'M') are made of whole days
+    return isinstance(level, Tick) and pd.Timedelta(days=1).value % level.nanos == 0
+
+
+def same_day_last_year(day):
+    # Feb 29 has no counterpart the year before, compare it with Feb 28
+    if day.month == 2 and day.day == 29:
+        return datetime.date(day.year - 1, 2, 28)
+    return day.replace(year=day.year - 1)
+
+
+def kpi_windows(day):
+    return {
+        'today': (day_start(day), day_end(day)),
+        'yesterday': (day_start(day - datetime.timedelta(days=1)), day_start(day)),
+        'this_year': (day_start(datetime.date(day.year, 1, 1)), day_end(day)),
+        'last_year': (day_start(datetime.date(day.year - 1, 1, 1)), day_end(same_day_last_year(day))),
+    }
+
+
+def build_kpi_summary(df, df_index, last_day):
+    windows = kpi_windows(last_day)
+
+    # The window edges cut time into disjoint intervals: every row is summed once into its interval,
+    # then each window adds up the intervals it covers
+    edges = np.unique([edge.value for window in windows.values() for edge in window])
+    rows = df_index.slice(df, pd.Timestamp(edges[0], tz='UTC'), pd.Timestamp(edges[-1], tz='UTC'))
+    rows = rows[['libelle_region', *measure_columns]].assign(
+        interval=np.searchsorted(edges, rows['date'].values.view('int64'), side='right') - 1,
+    )
+    by_interval = rows.groupby(['libelle_region', 'interval'], observed=True)[measure_columns].sum()
+    intervals = by_interval.index.get_level_values('interval')
+
+    summary = {}
+    for name, (start, end) in windows.items():
+        first, last = np.searchsorted(edges, [start.value, end.value])
+        summary[name] = by_interval[(intervals >= first) & (intervals < last)].groupby(level='libelle_region', observed=True).sum()
+
+    summary = pd.concat(summary, axis=1).fillna(0)
+    summary.loc[Region.ALL_REGION] = summary.sum()
+    return summary
+
+
+class Dataset:
+    # One version of the eco2mix data and everything derived from it. Datasets are shared by every
+    # session and never modified once built: appending new rows builds the next version.
+    def __init__(self, version, df, df_by_day, last_day, df_index=None, df_by_day_index=None, rollup_cube=None, pending_days=None):
+        # last_day is a UTC day like the KPI windows, df ends with it. Without pending_days, the daily sums of the
+        # local days after it are split from df_by_day.
+        if pending_days is None:
+            df_by_day, pending_days = split_days(df_by_day, last_day)
+        self.version = version
+        self.df = df
+        self.df_by_day = df_by_day
+        self.pending_days = pending_days
+        self.last_day = last_day
+        self.df_index = df_index if df_index is not None else TimeIndex(df)
+        self.df_by_day_index = df_by_day_index if df_by_day_index is not None else TimeIndex(df_by_day)
+        self.regions = sorted(self.df_index.regions)
+        self.rollup_cube = rollup_cube if rollup_cube is not None else build_rollup_cube(df, df_by_day)
+        # Today, yesterday, this year and the same period last year, summed for every measure (columns) and
+        # every region (rows), e.g. kpi_summary.loc[Region.ALL_REGION, ('today', 'consommation')]
+        self.kpi_summary = build_kpi_summary(df, self.df_index, last_day)
+
+    def watermarks(self):
+        # Last ingested date_heure of every region
+        return {
+            region: pd.Timestamp(self.df_index.dates[stop - 1], tz='UTC')
+            for region, (start, stop) in self.df_index.regions.items() if stop > start
+        }
+
+    def append(self, rows, version):
+        # Only the rows after the watermarks are parsed, grouped and merged into the frames and the cube.
+        # The KPI summary only reads the last two years. The export has integer region codes, cast like the codes
+        # of the frames (strings in the Parquet snapshot) so that a partly ingested day is merged with its new rows.
+        rows = rows.assign(code_insee_region=rows['code_insee_region'].astype(code_dtype(self.df['code_insee_region'])))
+        rows, daily_rows = prepare_frames(rows, self.watermarks())
+        if not len(rows):
+            return None
+
+        # The UTC day of the last quarter-hour, and the local days up to it
+        last_day = max(self.last_day, rows['date'].max().date())
+        daily_rows, pending_days = split_days(add_pending_days(self.pending_days, daily_rows), last_day)
+
+        df, df_index = append_rows(self.df, self.df_index, rows)
+        df_by_day, df_by_day_index = append_rows(self.df_by_day, self.df_by_day_index, daily_rows)
+        return Dataset(
+            version, df, df_by_day,
+            last_day=last_day,
+            df_index=df_index,
+            df_by_day_index=df_by_day_index,
+            rollup_cube=append_rollup_cube(self.rollup_cube, rows, daily_rows),
+            pending_days=pending_days,
+        )
+
+    # The queries below are also implemented by sql_backend.SqlDataset
+
+    def date_range(self):
+        return pd.Timestamp(self.df_index.dates.min(), tz='UTC'), pd.Timestamp(self.df_index.dates.max(), tz='UTC')
+
+    def rows(self, choice_period, choice_region):
+        # Quarter-hours for Week and Month, days for Year and All Time
+        start, end = period_range(choice_period, self.last_day)
+
+        if rollup_source(choice_period) == 'raw':
+            return self.df_index.slice(self.df, start, end, choice_region)
+        return self.df_by_day_index.slice(self.df_by_day, start, end, choice_region)
+
+    def rollup(self, choice_period, choice_region, freq=None):
+        # Measures of the region over the period, grouped by freq (native timestamps if None), read from the
+        # coarsest level of the cube that freq is a multiple of
+        source = rollup_source(choice_period)
+        levels = rollup_levels[source]
+        level = levels[0] if freq is None else [level for level in levels if frequency_divides(level, freq)][-1]
+
+        rollup = rollup_slice(self, choice_period, choice_region, source, level)
+        profiling.add_rows_in(len(rollup))
+
+        if freq is not None and to_offset(level) != to_offset(freq):
+            rollup = rollup.resample(freq).sum()
+
+        return rollup
+
+    def sums_by_region(self, choice_period, regions):
+        # Measures of every region summed over the period, from the coarsest level of the cube
+        source = rollup_source(choice_period)
+        sums = [
+            np.nansum(rollup_slice(self, choice_period, region, source, rollup_levels[source][-1])[measure_columns].to_numpy(), axis=0)
+            for region in regions
+        ]
+        return pd.DataFrame(sums, index=pd.Index(regions, name='libelle_region'), columns=measure_columns)
+
+    def load_curve(self, year, choice_region):
+        # Consumption of the region at every quarter-hour of the year, from the native level of the cube
+        return rollup_slice(self, (Period.YEAR, year), choice_region, 'raw', rollup_levels['raw'][0])['consommation']
+
+
+class Partition:
+    # Quarter-hours and daily sums sorted by (libelle_region, date), without the rollup cube and KPI summary of
+    # Dataset: a partition holds one region over one year, so its queries group a few thousand rows. The daily
+    # sums of the local days after last_day are pending, like in Dataset.
+    def __init__(self, df, df_by_day, pending_days=None):
+        self.df = df
+        self.df_by_day = df_by_day
+        self.pending_days = pending_days if pending_days is not None else df_by_day.iloc[:0]
+        self.df_index = TimeIndex(df)
+        self.df_by_day_index = TimeIndex(df_by_day)
+        self.regions = sorted(self.df_index.regions)
+
+    watermarks = Dataset.watermarks
+
+    def rows(self, start, end, choice_region, source):
+        frame, index = (self.df, self.df_index) if source == 'raw' else (self.df_by_day, self.df_by_day_index)
+        # The appended rows of a region can all be in its pending days
+        if choice_region != Region.ALL_REGION and choice_region not in index.regions:
+            return frame.iloc[:0]
+        return index.slice(frame, start, end, choice_region)
+
+
+def read_partition(path):
+    # The partitions already have the compact dtypes and hold the quarter-hours of one region in order, so the
+    # daily sums add up runs of rows. Rows after last_day are removed like build_frames does.
+    rows = pq.read_table(path, columns=dataset_columns).to_pandas()
+    cut = day_end(last_day)
+    date_heure = to_datetime(rows['date_heure'])
+    stop = date_heure.searchsorted(cut)
+    if not stop:
+        return None
+    rows, date_heure = rows.iloc[:stop], date_heure.iloc[:stop]
+
+    dates = rows['date'].to_numpy()
+    starts = np.flatnonzero(np.append(True, dates[1:] != dates[:-1]))
+    df_by_day = pd.DataFrame({
+        'code_insee_region': rows['code_insee_region'].iloc[starts].to_numpy(),
+        'libelle_region': rows['libelle_region'].iloc[starts].to_numpy(),
+        'date': to_datetime(rows['date'].iloc[starts]).array,
+        **{column: np.add.reduceat(rows[column].to_numpy(), starts) for column in measure_columns},
+    })
+    df_by_day, pending_days = split_days(df_by_day, last_day)
+
+    df = rows.drop(['date', 'date_heure'], axis=1).assign(date=date_heure)
+    return Partition(df[['code_insee_region', 'libelle_region', 'date', *measure_columns]], df_by_day, pending_days)
+
+
+class PartitionCache:
+    # Partitions by (year, code_insee_region), read on first use and evicted least recently used first. None
+    # marks a partition with no rows up to last_day. The lock is not held while a partition is read: the first
+    # session to miss it reads it, the others wait for its Future in loading.
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.partitions = OrderedDict()
+        self.loading = {}
+        self.lock = threading.Lock()
+
+    def file(self, year, code):
+        return os.path.join(self.path, str(year), f'{code}.parquet')
+
+    def get(self, year, code):
+        with self.lock:
+            if (year, code) in self.partitions:
+                self.partitions.move_to_end((year, code))
+                return self.partitions[year, code]
+            future = self.loading.get((year, code))
+            if future is None:
+                future = self.loading[year, code] = Future()
+                reading = True
+            else:
+                reading = False
+        if not reading:
+            return future.result()
+
+        try:
+            partition = self.load(year, code)
+        except BaseException as error:
+            with self.lock:
+                del self.loading[year, code]
+            future.set_exception(error)
+            raise
+        with self.lock:
+            del self.loading[year, code]
+            # Inserted unless another read got there first
+            if (year, code) in self.partitions:
+                partition = self.partitions[year, code]
+            else:
+                self.partitions[year, code] = partition
+                if len(self.partitions) > self.size:
+                    self.partitions.popitem(last=False)
+        future.set_result(partition)
+        return partition
+
+    @profiled()
+    def load(self, year, code):
+        if not os.path.exists(self.file(year, code)):
+            return None
+        partition = read_partition(self.file(year, code))
+        profiling.add_rows_in(len(partition.df) if partition is not None else 0)
+        return partition
+
+
+class PartitionedDataset:
+    # Same interface as Dataset, over the partitions written by fix_files.py: a query only reads the partitions
+    # of its region and of the years its period intersects, and groups their rows. The rows of the real-time
+    # export are kept in one more in-memory Partition (appended).
+    def __init__(self, version, path, last_day, appended=None, partitions=None):
+        self.version = version
+        self.path = path
+        self.appended = appended
+        self.partitions = partitions if partitions is not None else PartitionCache(path, partition_cache_size)
+
+        # Partitions are split on the local day, so the year after last_day can hold the last hours of last_day
+        self.years = sorted(int(year) for year in os.listdir(path) if year.isdigit() and int(year) <= last_day.year + 1)
+        # Region names and the UTC day of the last quarter-hour from one column and the footer of the last
+        # partition of every region
+        codes = {file.removesuffix('.parquet'): year for year in self.years for file in os.listdir(os.path.join(path, str(year)))}
+        self.codes = {}
+        data_last_day = None
+        for code, year in codes.items():
+            file = self.partitions.file(year, code)
+            self.codes[pq.read_table(file, columns=['libelle_region'])['libelle_region'][0].as_py()] = code
+            day = pd.Timestamp(statistics_bounds(file, 'date_heure')[1], unit='s').date()
+            data_last_day = day if data_last_day is None else max(data_last_day, day)
+        if appended is not None:
+            data_last_day = max(data_last_day, appended.df['date'].max().date())
+        self.regions = sorted(self.codes)
+        self.last_day = min(last_day, data_last_day)
+
+        self.kpi_lock = threading.Lock()
+        self.kpi = None
+
+    def parts(self, years, choice_region):
+        # Partitions of the region (all regions for Region.ALL_REGION) over the years, then the appended rows
+        regions = self.regions if choice_region == Region.ALL_REGION else [choice_region]
+        parts = [self.partitions.get(year, self.codes[region]) for region in regions for year in years if year in self.years]
+        if self.appended is not None and (choice_region == Region.ALL_REGION or choice_region in self.appended.regions):
+            parts.append(self.appended)
+        return [part for part in parts if part is not None]
+
+    def period_years(self, choice_period):
+        # Local days start before the UTC ones, so the rows of [start, end) are in the years of the local days
+        start, end = period_range(choice_period, self.last_day)
+        end = day_end(self.last_day) if end is None else min(end, day_end(self.last_day))
+        first = self.years[0] if start is None else start.year
+        last = end.year if rollup_source(choice_period) == 'raw' else (end - pd.Timedelta(days=1)).year
+        return range(first, last + 1)
+
+    @property
+    def kpi_summary(self):
+        # From the quarter-hours of last year and this year, on first use
+        with self.kpi_lock:
+            if self.kpi is None:
+                parts = self.parts(range(self.last_day.year - 1, self.last_day.year + 2), Region.ALL_REGION)
+                df = concat_frames([part.df for part in parts])
+                if self.appended is not None:
+                    df = df.sort_values(['libelle_region', 'date'], ignore_index=True)
+                self.kpi = build_kpi_summary(df, TimeIndex(df), self.last_day)
+            return self.kpi
+
+    def last_partitions(self):
+        # The last partition of every region
+        partitions = []
+        for region, code in self.codes.items():
+            for year in reversed(self.years):
+                partition = self.partitions.get(year, code)
+                if partition is not None:
+                    partitions.append(partition)
+                    break
+        return partitions
+
+    def partition_watermarks(self):
+        # Last date_heure of every region in its last partition
+        watermarks = {}
+        for partition in self.last_partitions():
+            watermarks.update(partition.watermarks())
+        return watermarks
+
+    def watermarks(self):
+        return {**self.partition_watermarks(), **(self.appended.watermarks() if self.appended is not None else {})}
+
+    def append(self, rows, version):
+        # The export holds every recent row, so the appended rows are rebuilt from the rows after the partitions,
+        # and their daily sums from the pending ones of the partitions. Region codes are strings in the partitions.
+        rows = rows.assign(code_insee_region=rows['code_insee_region'].astype(str))
+        rows, daily_rows = prepare_frames(rows, self.partition_watermarks())
+        if not len(rows):
+            return None
+
+        # The UTC day of the last quarter-hour, and the local days up to it
+        last_day = max(self.last_day, rows['date'].max().date())
+        pending_days = [partition.pending_days for partition in self.last_partitions() if len(partition.pending_days)]
+        daily_rows = add_pending_days(concat_frames(pending_days), daily_rows) if pending_days else daily_rows
+        daily_rows, pending_days = split_days(daily_rows.sort_values(['libelle_region', 'date'], ignore_index=True), last_day)
+        appended = Partition(rows.sort_values(['libelle_region', 'date'], ignore_index=True), daily_rows, pending_days)
+        return PartitionedDataset(version, self.path, last_day, appended, self.partitions)
+
+    def date_range(self):
+        first_files = [self.partitions.file(self.years[0], code) for code in self.codes.values()]
+        first = min(statistics_bounds(file, 'date_heure')[0] for file in first_files if os.path.exists(file))
+        last = max(part.df_index.dates.max() for part in self.parts(self.years[-2:], Region.ALL_REGION))
+        return pd.Timestamp(first, unit='s', tz='UTC'), pd.Timestamp(last, tz='UTC')
+
+    def rows(self, choice_period, choice_region):
+        source = rollup_source(choice_period)
+        start, end = period_range(choice_period, self.last_day)
+        parts = self.parts(self.period_years(choice_period), choice_region)
+        if not parts:
+            return pd.DataFrame(columns=['code_insee_region', 'libelle_region', 'date', *measure_columns]).astype({'date': 'datetime64[ns, UTC]'})
+        rows = concat_frames([part.rows(start, end, choice_region, source) for part in parts])
+        if self.appended is not None and self.appended in parts:
+            if source == 'daily':
+                # The first appended day can be the last day of a partition
+                rows = rows.groupby(['code_insee_region', 'libelle_region', 'date'], observed=True, as_index=False)[measure_columns].sum()
+            rows = rows.sort_values(['libelle_region', 'date'], ignore_index=True)
+        return rows
+
+    def rollup(self, choice_period, choice_region, freq=None):
+        rows = self.rows(choice_period, choice_region)
+        profiling.add_rows_in(len(rows))
+        rollup = rows.groupby('date')[measure_columns].sum()
+        if freq is not None:
+            rollup = rollup.resample(freq).sum()
+        return rollup
+
+    def sums_by_region(self, choice_period, regions):
+        rows = self.rows(choice_period, regions[0] if len(regions) == 1 else Region.ALL_REGION)
+        sums = rows.groupby(rows['libelle_region'].astype(str))[measure_columns].sum()
+        return sums.reindex(pd.Index(regions, name='libelle_region'), fill_value=0)
+
+    def load_curve(self, year, choice_region):
+        # The last hours of Dec 31 (UTC) are in the partitions of the next year, split on the local day
+        start, end = period_range((Period.YEAR, year), self.last_day)
+        parts = self.parts(range(year, year + 2), choice_region)
+        rows = [part.rows(start, end, choice_region, 'raw')[['date', 'consommation']] for part in parts]
+        rows = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame({'date': pd.DatetimeIndex([], tz='UTC'), 'consommation': 0})
+        profiling.add_rows_in(len(rows))
+        return rows.groupby('date')['consommation'].sum()
+
+
+def statistics_bounds(path, column):
+    # Minimum and maximum of a column from the row group statistics in the footer of a Parquet file
+    metadata = pq.ParquetFile(path).metadata
+    index = metadata.schema.names.index(column)
+    statistics = [metadata.row_group(i).column(index).statistics for i in range(metadata.num_row_groups)]
+    return min(statistic.min for statistic in statistics), max(statistic.max for statistic in statistics)
+
+
+def file_fingerprint(path):
+    # Changes whenever the file is rewritten
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return f'{path}:{stat.st_mtime_ns}:{stat.st_size}'
+
+
+def dataset_source():
+    return file_fingerprint(DATA_PARQUET) or file_fingerprint(DATA_CSV) or DATA_URL
+
+
+def read_realtime_export(path):
+    rows = pd.read_csv(path, sep=';', usecols=dataset_columns)
+    # The export already lists the rest of the current day, without values
+    return rows[rows[measure_columns].notna().any(axis=1)]
+
+
+@profiled()
+def load_dataset(version):
+    if backend == 'duckdb' and os.path.exists(DATA_PARQUET):
+        from sql_backend import SqlDataset
+        return SqlDataset(version, DATA_PARQUET, last_day)
+    if backend == 'partitions' and os.path.isdir(DATA_PARTITIONS):
+        return PartitionedDataset(version, DATA_PARTITIONS, last_day)
+
+    rows = read_eco2mix()
+    profiling.add_rows_in(len(rows))
+    df, df_by_day = build_frames(rows)
+    # The UTC day of the last loaded quarter-hour, up to last_day, then of the last appended one
+    return Dataset(version, df, df_by_day, min(last_day, df['date'].max().date()))
+
+
+@profiled()
+def refresh_dataset(dataset, path, version):
+    rows = read_realtime_export(path)
+    profiling.add_rows_in(len(rows))
+    return dataset.append(rows, version)
+
+
+class DatasetRegistry:
+    # Loaded datasets by version token. The current version is built from the source file (reloaded when
+    # it changes) plus the rows of the real-time export (appended when it changes). Only the first version is
+    # waited for: the next ones are built by a background thread while the current one is served, then swapped
+    # in at once. The previous version is kept for the reruns that started before it was replaced, and the reruns
+    # that started before two swaps are served the current one.
+    def __init__(self):
+        self.datasets = {}
+        self.current_version = None
+        self.previous_version = None
+        self.source = None
+        self.export = None
+        # Held while a version is built
+        self.lock = threading.Lock()
+        # (source, export) of the last build that failed, not retried in the background until a file changes
+        self.failed = None
+        self.error = None
+        self.built_at = None
+        self.build_s = None
+
+    def publish(self, dataset):
+        query_cache.preload(read_prewarmed(dataset.version))
+        self.datasets[dataset.version] = dataset
+        self.datasets.pop(self.previous_version, None)
+        self.previous_version, self.current_version = self.current_version, dataset.version
+
+    def stale(self):
+        export = file_fingerprint(DATA_REALTIME)
+        return dataset_source() != self.source or (export is not None and export != self.export)
+
+    def build(self):
+        with self.lock:
+            if self.current_version is not None and not self.stale():
+                # Built by another thread meanwhile
+                return
+            source, export = dataset_source(), file_fingerprint(DATA_REALTIME)
+            start = time.perf_counter()
+            try:
+                if source != self.source:
+                    dataset, appended = load_dataset(source), None
+                else:
+                    dataset, appended = self.datasets[self.current_version], self.export
+                if export is not None and export != appended:
+                    dataset = refresh_dataset(dataset, DATA_REALTIME, f'{source}+{export}') or dataset
+                # The aggregates every page reads first are built before the swap
+                dataset.kpi_summary
+            except Exception as error:
+                self.failed, self.error = (source, export), f'{type(error).__name__}: {error}'
+                raise
+
+            if dataset.version != self.current_version:
+                self.publish(dataset)
+            self.source, self.export = source, export
+            self.failed, self.error = None, None
+            self.built_at, self.build_s = datetime.datetime.now(), time.perf_counter() - start
+
+    def build_in_background(self):
+        if self.lock.locked() or (dataset_source(), file_fingerprint(DATA_REALTIME)) == self.failed:
+            return
+        threading.Thread(target=self.build_or_report, name='dataset-build').start()
+
+    def build_or_report(self):
+        try:
+            self.build()
+        except Exception:
+            # The current version is still served, the error is in status()
+            traceback.print_exc()
+
+    def current(self):
+        if self.current_version is None:
+            self.build()
+        elif self.stale():
+            self.build_in_background()
+        return self.current_version
+
+    def status(self):
+        if self.lock.locked():
+            state = 'building'
+        elif self.error is not None:
+            state = 'failed'
+        else:
+            state = 'ready' if self.current_version is not None else 'empty'
+        return {
+            'state': state,
+            'version': self.current_version,
+            'previous_version': self.previous_version,
+            'built_at': self.built_at,
+            'build_s': self.build_s,
+            'error': self.error,
+        }
+
+    def get(self, version):
+        dataset = self.datasets.get(version)
+        return dataset if dataset is not None else self.datasets[self.current_version]
+
+
+registry = DatasetRegistry()
+
+
+def load_data():
+    # Returns the version token of the current dataset, loading it on first use only. The query functions below
+    # take this token rather than the frames, so a cache hashes a short string instead of millions of rows.
+    return registry.current()
+
+
+def get_load_status():
+    # State of the datasets (building, ready, failed), the current version and how long it took to build
+    return registry.status()
+
+
+def get_dataset(version):
+    return registry.get(version)
+
+
+# Not cached: slicing costs a few binary searches, and a cached copy per selection would defeat sharing
+@profiled()
+def get_data_for_region_and_period(version, choice_period, choice_region):
+    return get_dataset(version).rows(choice_period, choice_region)
+
+
+@profiled(cache=query_cache)
+def get_rollup(version, choice_period, choice_region, freq=None):
+    return get_dataset(version).rollup(choice_period, choice_region, freq)
+
+
+def rollup_slice(dataset, choice_period, choice_region, source, level):
+    rollup = dataset.rollup_cube[source, level][choice_region]
+
+    start, end = period_range(choice_period, dataset.last_day)
+    if start is not None:
+        rollup = rollup.iloc[rollup.index.searchsorted(start):]
+    if end is not None:
+        rollup = rollup.iloc[:rollup.index.searchsorted(end)]
+    return rollup
+
+
+@profiled(cache=query_cache)
+def get_period_totals(version, choice_period, choice_region):
+    levels = rollup_levels[rollup_source(choice_period)]
+    return get_rollup(version, choice_period, choice_region, levels[-1]).sum()
+
+
+@profiled(cache=query_cache)
+def get_sources_by_region(version, choice_period, choice_region):
+    dataset = get_dataset(version)
+    regions = dataset.regions if choice_region == Region.ALL_REGION else [choice_region]
+    return dataset.sums_by_region(choice_period, regions)[source_columns]
+
+
+@profiled(cache=query_cache)
+def get_yearly_totals(version):
+    # Sources per (year, region), computed once per dataset: the totals of a year or of all time are read from it
+    dataset = get_dataset(version)
+    first, last = dataset.date_range()
+    return pd.concat({
+        year: dataset.sums_by_region((Period.YEAR, year), dataset.regions)[source_columns]
+        for year in range(first.year, last.year + 1)
+    }, names=['year'])
+
+
+def get_region_totals(version, choice_period):
+    # Sources per region over a period: Week and Month from their raw rows, years from the yearly totals
+    if rollup_source(choice_period) == 'raw':
+        return get_sources_by_region(version, choice_period, Region.ALL_REGION)
+    yearly = get_yearly_totals(version)
+    if choice_period[0] == Period.YEAR:
+        yearly = yearly[yearly.index.get_level_values('year') == choice_period[1]]
+    regions = pd.Index(get_dataset(version).regions, name='libelle_region')
+    return yearly.groupby(level='libelle_region').sum().reindex(regions, fill_value=0)
+
+
+# Groups of the clean/dirty split of the Production page, nuclear being neither
+energy_groups = {
+    'propre': ['eolien', 'solaire', 'hydraulique', 'bioenergies'],
+    'sale': ['thermique'],
+    'nucleaire': ['nucleaire'],
+}
+energy_group_matrix = np.array([[source in group for source in source_columns] for group in energy_groups.values()], dtype='int64')
+
+
+class EnergyMix:
+    # Everything the Production page shows for a period and a region, reduced from the wide per-source arrays:
+    # nothing is melted into one row per (date, source)
+    def __init__(self, native, stacked, by_region):
+        # Sum of the sources at every native timestamp
+        self.total = pd.DataFrame({'energy_value': np.nansum(native[source_columns].to_numpy(), axis=1)}, index=native.index)
+        # Sources resampled for the stacked area chart
+        self.stacked = stacked[source_columns]
+        # Totals of the period, per region (heatmap), per source and per group
+        self.by_region = by_region
+        totals = by_region.to_numpy().sum(axis=0)
+        self.source_totals = pd.DataFrame({'energy_value': totals}, index=pd.Index(source_columns, name='energy_source'))
+        self.group_totals = pd.DataFrame({'energy_value': energy_group_matrix @ totals}, index=pd.Index(list(energy_groups), name='energy_source'))
+
+
+# Resampling frequencies of the Production and Exchanges charts
+production_freqs = {Period.WEEK: '15min', Period.MONTH: '6H', Period.YEAR: '1D', Period.ALL_TIME: '15D'}
+exchanges_freqs = {Period.WEEK: '6H', Period.MONTH: 'D', Period.YEAR: '3D', Period.ALL_TIME: 'M'}
+
+
+@profiled(cache=query_cache)
+def get_energy_mix(version, choice_period, choice_region, freq):
+    return EnergyMix(
+        get_rollup(version, choice_period, choice_region),
+        get_rollup(version, choice_period, choice_region, freq),
+        get_sources_by_region(version, choice_period, choice_region),
+    )
+
+
+@profiled(cache=query_cache)
+def get_consumption_data(version, choice_period, choice_region):
+    return get_rollup(version, choice_period, choice_region)['consommation']
+
+
+# Not cached: a slice with three columns dropped, only read by get_energy_sources_data, which is
+@profiled()
+def get_energy_sources_data_with_region(version, choice_period, choice_region):
+    return get_data_for_region_and_period(version, choice_period, choice_region) \
+        .drop(['code_insee_region', 'consommation', 'ech_physiques'], axis=1)
+
+
+@profiled(cache=query_cache)
+def get_energy_sources_data(version, choice_period, choice_region):
+    return get_energy_sources_data_with_region(version, choice_period, choice_region) \
+        .drop(['libelle_region'], axis=1) \
+        .melt(id_vars=['date'], var_name='energy_source', value_name='energy_value')
+
+
+@profiled(cache=query_cache)
+def get_exchange_data(version, choice_period, choice_region):
+    return get_data_for_region_and_period(version, choice_period, choice_region)[['date', 'libelle_region', 'ech_physiques']].reset_index()
+
+
+@profiled(cache=query_cache)
+def get_map_data(version, choice_period):
+    # One row per (region, source) for the single column layer of the Map: the sources of a region are stacked,
+    # base being the total of the sources below. Only what the layer reads is sent to the browser.
+    totals = get_region_totals(version, choice_period)
+    values = totals.to_numpy().round().astype('int64')
+    coordinates = region_coordinates.loc[totals.index]
+    return pd.DataFrame({
+        'lon': np.repeat(coordinates['lon'].to_numpy(), len(source_columns)),
+        'lat': np.repeat(coordinates['lat'].to_numpy(), len(source_columns)),
+        'base': (values.cumsum(axis=1) - values).ravel(),
+        'value': values.ravel(),
+        'color': [color_scale_rgb[source] for source in source_columns] * len(totals),
+    })
+
+
+def read_prewarmed(version):
+    # The format and version come first in the file: the results are only read if they were computed from this
+    # dataset by this code
+    if not os.path.exists(DATA_PREWARM):
+        return {}
+    with open(DATA_PREWARM, 'rb') as prewarm_file:
+        if pickle.load(prewarm_file) != (prewarm_format, version):
+            return {}
+        return pickle.load(prewarm_file)
+
+
+def read_manifest():
+    if not os.path.exists(DATA_MANIFEST):
+        return None
+    with open(DATA_MANIFEST) as manifest_file:
+        return json.load(manifest_file)
+
+
+def load_in_background():
+    # Starts loading the dataset without waiting for it, so that Home renders from the manifest alone
+    if registry.stale():
+        registry.build_in_background()
+
+
+# The selectors below read the manifest when there is one, and the dataset otherwise. The manifest describes the
+# snapshot: its days are capped at the last day of the current dataset, which appended exports move past the
+# snapshot's, and at last_day before the first load.
+
+def selector_last_day(version=None):
+    version = version or registry.current_version
+    return last_day if version is None else get_dataset(version).last_day
+
+
+def get_date_range(version=None):
+    manifest = read_manifest()
+    if manifest is None:
+        return get_dataset(version or load_data()).date_range()
+    # Up to the last quarter-hour of the last day like the datasets, past the snapshot once an export is appended
+    day = selector_last_day(version)
+    last = day_end(day) - pd.Timedelta(minutes=15)
+    if pd.Timestamp(manifest['last']) < day_start(day):
+        return pd.Timestamp(manifest['first']), last
+    return pd.Timestamp(manifest['first']), min(pd.Timestamp(manifest['last']), last)
+
+
+def get_year_list(version=None):
+    manifest = read_manifest()
+    if manifest is None:
+        first, last = get_date_range(version)
+        return list(range(first.year, last.year + 1))
+    day = selector_last_day(version)
+    return [year for year in sorted({*manifest['years'], day.year}) if year <= day.year]
+
+
+@profiled(cache=query_cache)
+def get_region_list(version=None):
+    manifest = read_manifest()
+    if manifest is None:
+        return [Region.ALL_REGION, *get_dataset(version or load_data()).regions]
+    end = day_end(selector_last_day(version))
+    return [Region.ALL_REGION, *sorted(region for region, stats in manifest['regions'].items() if pd.Timestamp(stats['first']) < end)]
+
+
+def format_watts(value):
+    if value >= 1000000:
+        return f'{value / 1000000:.1f} TW'
+    if value >= 1000:
+        return f'{value / 1000:.1f} GW'
+    return f'{value:.1f} MW'
+
+
+region_coordinates = pd.DataFrame.from_dict({
+    'Auvergne-Rhône-Alpes': [45.75, 4.85],
+    'Bourgogne-Franche-Comté': [47.25, 5.95],
+    'Bretagne': [48.25, -2.75],
+    'Centre-Val de Loire': [47.75, 1.75],
+    'Corse': [42.25, 9.25],
+    'Grand Est': [48.75, 5.75],
+    'Hauts-de-France': [50.5, 2.75],
+    'Île-de-France': [48.75, 2.25],
+    'Normandie': [49.25, 0.25],
+    'Nouvelle-Aquitaine': [45.25, 0.25],
+    'Occitanie': [43.75, 1.75],
+    'Pays de la Loire': [47.5, -0.75],
+    "Provence-Alpes-Côte d'Azur": [43.75, 6.25],
+}, orient='index', columns=['lat', 'lon'])
+
+color_scale_rgb = {
+    'thermique': [255, 82, 88],
+    'nucleaire': [255, 187, 74],
+    'eolien': [144, 248, 255],
+    'solaire': [249, 255, 114],
+    'hydraulique': [0, 149, 255],
+    'bioenergies': [121, 255, 105],
+}
+
+color_scale_hex = {
+    'thermique': '#FF5258',
+    'nucleaire': '#FFBB4A',
+    'eolien': '#90F8FF',
+    'solaire': '#F9FF72',
+    'hydraulique': '#0095FF',
+    'bioenergies': '#79FF69',
+}
+
+npp_coordinates = pd.DataFrame.from_dict({
+    'Belleville': [47.510534, 2.8761864],
+    'Blayais': [45.255833, -0.693056],
+    'Bugey': [45.798333, 5.270833],
+    'Cattenom': [49.4158, 6.2181],
+    'Chinon': [47.230556, 0.170556],
+    'Chooz-B': [50.09, 4.789444],
+    'Civaux': [46.456667, 0.652778],
+    'Cruas': [44.633056, 4.756667],
+    'Dampierre': [47.7336808, 2.5172853],
+    'Fessenheim': [47.9032247, 7.5623059],
+    'Flamanville': [49.536389, -1.881667],
+    'Golfech': [44.1067, 0.8453],
+    'Gravelines': [51.015278, 2.136111],
+    'Nogent': [48.515278, 3.517778],
+    'Paluel': [49.858056, 0.635556],
+    'Penly': [49.976667, 1.211944],
+    'Saint-Alban': [45.4042957, 4.7555351],
+    'Saint-Laurent-B': [47.72, 1.5775],
+    'Tricastin': [44.329722, 4.732222],
+}, orient='index', columns=['lat', 'lon'])
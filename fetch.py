@@ -0,0 +1,175 @@
+# Download layer of the remote fallback of eco2mix.read_eco2mix:
+#   - the remote file is streamed to an on-disk cache, and revalidated with its ETag / Last-Modified on the next
+#     cold start (a 304 reads the cached copy, nothing is transferred),
+#   - an interrupted download is resumed with an HTTP range from what is already in the cache,
+#   - CSV (plain or gzip, by suffix or Content-Encoding) is parsed while it downloads, Parquet once it is complete.
+# Only the standard library, so that it runs wherever the app does.
+#
+#   ECO2MIX_CACHE_DIR=/var/cache/eco2mix streamlit run 0_🏠_Home.py
+
+import gzip
+import http.client
+import io
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+
+cache_dir = os.environ.get('ECO2MIX_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'eco2mix'))
+timeout_s = 30
+# Read size of the response, also the size of the writes to the cache
+block_size = 1 << 20
+
+
+class Download(io.RawIOBase):
+    # The bytes of a remote file as they are read: first the part already in the cache, then the response, which
+    # is appended to the part. At the end of the response the part becomes the cached file.
+    def __init__(self, entry, response, resumed):
+        self.entry = entry
+        self.response = response
+        self.cached = open(entry.part, 'rb') if resumed else None
+        self.part = open(entry.part, 'ab' if resumed else 'wb')
+        # http.client reads a dropped connection as the end of the body
+        self.remaining = int(response.headers['Content-Length']) if response.headers.get('Content-Length') else None
+        self.done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.cached is not None:
+            count = self.cached.readinto(buffer)
+            if count:
+                return count
+            self.cached.close()
+            self.cached = None
+
+        count = self.response.readinto(buffer)
+        if count:
+            self.part.write(memoryview(buffer)[:count])
+            if self.remaining is not None:
+                self.remaining -= count
+        elif self.remaining:
+            raise http.client.IncompleteRead(b'', self.remaining)
+        elif not self.done:
+            self.done = True
+            self.part.close()
+            self.entry.complete()
+        return count
+
+    def close(self):
+        if not self.done:
+            # Interrupted: keep the part for the next attempt
+            self.part.close()
+        if self.cached is not None:
+            self.cached.close()
+        self.response.close()
+        super().close()
+
+
+class CacheEntry:
+    # <cache_dir>/<file name of the url> with its part and a JSON sidecar holding the validators of the response
+    def __init__(self, url, directory):
+        name = os.path.basename(urllib.parse.urlparse(url).path) or 'download'
+        self.url = url
+        self.path = os.path.join(directory, name)
+        self.part = self.path + '.part'
+        self.meta_path = self.path + '.json'
+        os.makedirs(directory, exist_ok=True)
+        self.meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as meta_file:
+                self.meta = json.load(meta_file)
+            if self.meta.get('url') != url:
+                self.meta = {}
+
+    def save(self, **meta):
+        self.meta = {'url': self.url, **meta}
+        with open(self.meta_path, 'w') as meta_file:
+            json.dump(self.meta, meta_file)
+
+    def complete(self):
+        os.replace(self.part, self.path)
+        self.save(**{**self.meta, 'complete': True})
+
+    def validators(self):
+        return {key: self.meta[key] for key in ['etag', 'last_modified'] if self.meta.get(key)}
+
+    def fresh(self):
+        return self.meta.get('complete') and os.path.exists(self.path)
+
+    def resumable(self):
+        return not self.meta.get('complete') and self.validators() and os.path.exists(self.part)
+
+
+def request(url, headers):
+    try:
+        return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout_s)
+    except urllib.error.HTTPError as error:
+        # 304 and 416 are answers, not failures
+        if error.code in (304, 416):
+            return error
+        raise
+
+
+def open_remote(url, directory=None):
+    # A binary file object of the remote file, read from the cache when it is still valid
+    entry = CacheEntry(url, directory or cache_dir)
+    headers = {'Accept-Encoding': 'gzip'}
+    resume_from = 0
+
+    if entry.fresh():
+        validators = entry.validators()
+        if 'etag' in validators:
+            headers['If-None-Match'] = validators['etag']
+        if 'last_modified' in validators:
+            headers['If-Modified-Since'] = validators['last_modified']
+    elif entry.resumable():
+        resume_from = os.path.getsize(entry.part)
+        headers['Range'] = f'bytes={resume_from}-'
+        # The range is only honored if the remote file did not change since the part was written
+        headers['If-Range'] = entry.validators().get('etag') or entry.validators()['last_modified']
+
+    try:
+        response = request(url, headers)
+    except (urllib.error.URLError, OSError):
+        # Offline: a complete copy is better than nothing
+        if entry.fresh():
+            return open(entry.path, 'rb'), entry
+        raise
+
+    if response.code == 304:
+        response.close()
+        return open(entry.path, 'rb'), entry
+
+    resumed = response.code == 206 and response.headers.get('Content-Range', '').startswith(f'bytes {resume_from}-')
+    if response.code == 416 or (response.code == 206 and not resumed):
+        # The part is not a prefix of the remote file anymore
+        response.close()
+        os.remove(entry.part)
+        entry.save()
+        return open_remote(url, directory)
+    if not resumed:
+        entry.save(
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            encoding=response.headers.get('Content-Encoding'),
+        )
+    return io.BufferedReader(Download(entry, response, resumed), buffer_size=block_size), entry
+
+
+def read_remote(url, columns=None, directory=None):
+    stream, entry = open_remote(url, directory)
+    with stream:
+        if url.endswith('.parquet'):
+            # The footer of a Parquet file is at its end: download it all first
+            while stream.read(block_size):
+                pass
+            return pd.read_parquet(entry.path, columns=columns)
+
+        if entry.meta.get('encoding') == 'gzip' or url.endswith('.gz'):
+            stream = gzip.GzipFile(fileobj=stream)
+        return pd.read_csv(stream, usecols=columns)
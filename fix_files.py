@@ -1,26 +1,257 @@
+# Builds eco2mix-regional.csv, eco2mix-regional.parquet, the eco2mix-regional/ partitions and their manifest from the historical (full) and real-time (tr)
+# eco2mix exports, in bounded memory:
+#   1. each export is read in chunks, normalized and written as sorted runs to a temporary directory,
+#   2. the runs are merged on (code_insee_region, date_heure), keeping the historical row when both
+#      exports contain the same quarter-hour,
+#   3. the merged blocks are appended to the CSV and Parquet outputs as they come, and to one Parquet
+#      partition per (year, region) read lazily by eco2mix.PartitionedDataset,
+#   4. the manifest (date range, years, regions, row counts, column statistics) lets the app start without
+#      reading the data, see eco2mix.read_manifest.
+# Peak memory is proportional to --chunk-size, not to the size of the exports.
+#
+#   python fix_files.py --chunk-size 200000
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+measure_columns = ['consommation', 'thermique', 'nucleaire', 'eolien', 'solaire', 'hydraulique', 'bioenergies', 'ech_physiques']
+dataset_columns = ['code_insee_region', 'libelle_region', 'date', 'date_heure', *measure_columns]
+
+# Typed schema of the columnar snapshot read by eco2mix.load_data: dictionary-encoded regions,
+# epoch seconds for the timestamps and int32 measures (all eco2mix values are whole MW)
+columnar_schema = pa.schema([
+    ('code_insee_region', pa.dictionary(pa.int32(), pa.string())),
+    ('libelle_region', pa.dictionary(pa.int32(), pa.string())),
+    ('date', pa.int64()),
+    ('date_heure', pa.int64()),
+    *[(column, pa.int32()) for column in measure_columns],
+])
+
+# Lower rank wins when both exports contain the same (region, quarter-hour)
+sources = [
+    ('eco2mix-regional-full.csv', 0),
+    ('eco2mix-regional-tr.csv', 1),
+]
+
+
+def to_epoch_seconds(column):
+    return (pd.to_datetime(column, utc=True) - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+
+
+def date_heure_to_epoch_seconds(column):
+    # pandas falls back to a slow path for the mixed +01:00/+02:00 offsets, so the local time
+    # and the (few distinct) offsets are parsed separately
+    local = pd.to_datetime(column.str.slice(0, 19), format='%Y-%m-%dT%H:%M:%S')
+    offset = column.str.slice(19).astype('category')
+    offset_seconds = offset.cat.categories.map(lambda o: int(o[0] + '1') * (int(o[1:3]) * 3600 + int(o[4:6]) * 60))
+    return (local - pd.Timestamp(0)) // pd.Timedelta(seconds=1) - offset_seconds.to_numpy()[offset.cat.codes]
+
+
+def merge_key(df):
+    # Region codes are at most two digits and epoch seconds stay below 10^10 until 2286
+    return df['code_insee_region'].astype('int64') * 10**10 + date_heure_to_epoch_seconds(df['date_heure'])
+
+
+def to_columnar(df):
+    columnar = pd.DataFrame({
+        'code_insee_region': df['code_insee_region'].astype(str),
+        'libelle_region': df['libelle_region'],
+        # The local calendar day, stored as its midnight in UTC like load_data does for df_by_day
+        'date': to_epoch_seconds(df['date']),
+        'date_heure': df['key'] % 10**10,
+        **{column: df[column].fillna(0).round().astype('int32') for column in measure_columns},
+    })
+    return pa.Table.from_pandas(columnar, schema=columnar_schema, preserve_index=False)
+
+
+def local_years(table):
+    # Year of the local day of every row of a columnar table
+    return (table['date'].to_numpy() // 86400).astype('datetime64[D]').astype('datetime64[Y]').astype(int) + 1970
+
+
+def isoformat(epoch_seconds):
+    return pd.Timestamp(epoch_seconds, unit='s', tz='UTC').isoformat()
+
+
+class Manifest:
+    # Summary of the snapshot accumulated block by block, written next to it as JSON
+    def __init__(self):
+        self.rows = 0
+        self.regions = {}
+        self.partitions = {}
+        self.columns = {}
+
+    def add(self, table):
+        self.rows += table.num_rows
+        frame = table.to_pandas().assign(year=local_years(table))
+
+        by_region = frame.groupby(['libelle_region', 'code_insee_region'], observed=True)['date_heure'].agg(['size', 'min', 'max'])
+        for (region, code), (size, first, last) in by_region.iterrows():
+            known = self.regions.setdefault(region, {'code': code, 'rows': 0, 'first': first, 'last': last})
+            known['rows'] += size
+            known['first'], known['last'] = min(known['first'], first), max(known['last'], last)
+
+        for (year, code), size in frame.groupby(['year', 'code_insee_region'], observed=True).size().items():
+            key = f'{year}/{code}'
+            self.partitions[key] = self.partitions.get(key, 0) + size
+
+        for column in measure_columns:
+            values = frame[column].to_numpy()
+            known = self.columns.setdefault(column, {'min': values.min(), 'max': values.max(), 'sum': 0})
+            known['min'], known['max'] = min(known['min'], values.min()), max(known['max'], values.max())
+            known['sum'] += values.sum(dtype='int64')
+
+    def write(self, path):
+        manifest = {
+            'rows': self.rows,
+            'first': isoformat(min(region['first'] for region in self.regions.values())),
+            'last': isoformat(max(region['last'] for region in self.regions.values())),
+            'years': sorted({int(key.split('/')[0]) for key in self.partitions}),
+            'regions': {
+                region: {**stats, 'first': isoformat(stats['first']), 'last': isoformat(stats['last'])}
+                for region, stats in sorted(self.regions.items())
+            },
+            'partitions': dict(sorted(self.partitions.items())),
+            'columns': self.columns,
+        }
+        with open(path, 'w') as manifest_file:
+            # numpy integers are not JSON serializable
+            json.dump(manifest, manifest_file, indent=1, ensure_ascii=False, default=int)
+
+
+class PartitionWriter:
+    # Writes <directory>/<year>/<code_insee_region>.parquet, the year being the one of the local day. Blocks come
+    # sorted by (region, date_heure), so a partition is complete as soon as the next one starts.
+    def __init__(self, directory):
+        self.directory = directory
+        self.key = None
+        self.writer = None
+
+    def write(self, table):
+        years = local_years(table)
+        codes = np.array(table['code_insee_region'].to_pylist())
+        changes = np.flatnonzero((years[1:] != years[:-1]) | (codes[1:] != codes[:-1])) + 1
+        start = 0
+        for stop in [*changes, len(years)]:
+            key = (years[start], codes[start])
+            if key != self.key:
+                self.close()
+                os.makedirs(os.path.join(self.directory, str(key[0])), exist_ok=True)
+                self.writer = pq.ParquetWriter(os.path.join(self.directory, str(key[0]), f'{key[1]}.parquet'), columnar_schema)
+                self.key = key
+            self.writer.write_table(table.slice(start, stop - start))
+            start = stop
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+        self.writer = None
+
+
+def peak_memory_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read_normalized(path, rank, chunk_size):
+    for chunk in pd.read_csv(path, sep=';', chunksize=chunk_size):
+        chunk = chunk[dataset_columns].copy()
+        chunk['key'] = merge_key(chunk)
+        chunk['rank'] = rank
+        yield chunk
+
+
+def write_sorted_runs(tmp_dir, chunk_size, stats):
+    runs = []
+    for path, rank in sources:
+        for chunk in read_normalized(path, rank, chunk_size):
+            stats['rows_in'] += len(chunk)
+            run = os.path.join(tmp_dir, f'run-{len(runs)}.parquet')
+            chunk.sort_values(['key', 'rank'], kind='stable').to_parquet(run, index=False)
+            runs.append(run)
+        print(f'Split {path} into sorted runs')
+    return runs
+
+
+def merge_runs(runs, chunk_size):
+    # Every run contributes a block of at most chunk_size / len(runs) rows at a time
+    block_size = max(chunk_size // max(len(runs), 1), 1_000)
+    readers = [(batch.to_pandas() for batch in pq.ParquetFile(run).iter_batches(batch_size=block_size)) for run in runs]
+    buffers = [next(reader, None) for reader in readers]
+    last_key = None
+
+    while any(buffer is not None for buffer in buffers):
+        # Rows up to the smallest of the buffered maxima can't be followed by a smaller key in any run
+        bound = min(buffer['key'].iat[-1] for buffer in buffers if buffer is not None)
+
+        taken = []
+        for i, buffer in enumerate(buffers):
+            if buffer is None:
+                continue
+            stop = np.searchsorted(buffer['key'].to_numpy(), bound, side='right')
+            taken.append(buffer.iloc[:stop])
+            buffers[i] = buffer.iloc[stop:] if stop < len(buffer) else next(readers[i], None)
+
+        block = pd.concat(taken).sort_values(['key', 'rank'], kind='stable')
+        block = block[~block['key'].duplicated()]
+        if last_key is not None:
+            # A run may continue with the key that ended the previous block
+            block = block[block['key'] > last_key]
+        if len(block):
+            last_key = block['key'].iat[-1]
+            yield block.drop(['rank'], axis=1)
+
 
-df_full = pd.read_csv('eco2mix-regional-full.csv', sep=';')
-df_recent = pd.read_csv('eco2mix-regional-tr.csv', sep=';')
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chunk-size', type=int, default=200_000, help='rows held in memory per step')
+    parser.add_argument('--output-csv', default='eco2mix-regional.csv')
+    parser.add_argument('--output-parquet', default='eco2mix-regional.parquet')
+    parser.add_argument('--output-partitions', default='eco2mix-regional')
+    parser.add_argument('--output-manifest', default='eco2mix-regional.json')
+    args = parser.parse_args()
 
-print('Loaded')
+    start = time.perf_counter()
+    stats = {'rows_in': 0, 'rows_out': 0}
 
-cols = ['nature', 'heure', 'column_68', 'pompage', 'stockage_batterie', 'destockage_batterie', 'eolien_terrestre', 'eolien_offshore', 'tco_thermique', 'tch_thermique', 'tco_nucleaire', 'tch_nucleaire', 'tco_eolien', 'tch_eolien', 'tco_solaire', 'tch_solaire', 'tco_hydraulique', 'tch_hydraulique', 'tco_bioenergies', 'tch_bioenergies', 'column_30']
-df_full = df_full.drop(cols, axis=1, errors='ignore')
-df_recent = df_recent.drop(cols, axis=1, errors='ignore')
+    with tempfile.TemporaryDirectory(dir='.') as tmp_dir:
+        runs = write_sorted_runs(tmp_dir, args.chunk_size, stats)
 
-print('Dropped columns')
+        if os.path.exists(args.output_partitions):
+            shutil.rmtree(args.output_partitions)
+        writer = pq.ParquetWriter(args.output_parquet, columnar_schema)
+        partitions = PartitionWriter(args.output_partitions)
+        manifest = Manifest()
+        with open(args.output_csv, 'w', newline='') as csv_file:
+            for i, block in enumerate(merge_runs(runs, args.chunk_size)):
+                block.drop(['key'], axis=1).to_csv(csv_file, index=False, header=i == 0)
+                table = to_columnar(block)
+                writer.write_table(table)
+                partitions.write(table)
+                manifest.add(table)
+                stats['rows_out'] += len(block)
+        writer.close()
+        partitions.close()
+        manifest.write(args.output_manifest)
 
-df_full.to_csv('eco2mix-regional-full.csv', index=False)
-print('Saved full')
+    print('Saved merged')
 
-df_recent.to_csv('eco2mix-regional-tr.csv', index=False)
-print('Saved recent')
+    elapsed = time.perf_counter() - start
+    print(f'\nRows read: {stats["rows_in"]}, written: {stats["rows_out"]}, '
+          f'duplicates dropped: {stats["rows_in"] - stats["rows_out"]}')
+    print(f'Time: {elapsed:.1f}s ({stats["rows_in"] / elapsed:,.0f} rows/s), peak memory: {peak_memory_mb():.0f} MB')
 
-merged = pd.concat([df_full, df_recent])
-print('Merged')
+    print('\n\nDone!')
 
-merged.to_csv('eco2mix-regional.csv', index=False)
-print('Saved merged')
 
-print('\n\nDone!')
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# Peak-demand statistics of the consumption of a region over a year, for capacity planning:
+#   - the load-duration curve, the quarter-hours of the year from the highest load to the lowest, and its percentiles,
+#   - the top-N peak quarter-hours,
+#   - the maxima of the load over the trailing 24 hours and 7 days,
+#   - the share of the hours above a threshold.
+# Computed once per (region, year) on the sorted quarter-hours of the year, placed on a regular grid, so that each
+# statistic is an index into a sorted array, a partition or a sliding-window kernel rather than a pandas rolling.
+#
+#   profile = load_analytics.get_load_profile(eco2mix.load_data(), eco2mix.Region.ALL_REGION, 2022)
+#   profile.percentiles['p99'], profile.top_peaks(10), profile.hours_above(80000)
+
+import numpy as np
+import pandas as pd
+
+import eco2mix
+from profiling import profiled
+
+quarter_hour = pd.Timedelta(minutes=15)
+# Quarter-hours of the rolling windows
+rolling_windows = {'24h': 24 * 4, '7d': 7 * 24 * 4}
+percentile_levels = {'p50': 0.5, 'p90': 0.9, 'p95': 0.95, 'p99': 0.99, 'p99.9': 0.999}
+# Points of the load-duration curve kept for the chart
+curve_points = 500
+
+
+def rolling_max(values, window):
+    # Maximum of the window values ending at every position (fewer at the start), in three passes over the array
+    # whatever the window (van Herk/Gil-Werman): the maximum of a window is the maximum of the suffix of the block it
+    # starts in and of the prefix of the block it ends in
+    n = len(values)
+    window = max(1, min(window, n))
+    blocks = -(-(n + window - 1) // window)
+    padded = np.full(blocks * window, -np.inf)
+    padded[window - 1:window - 1 + n] = values
+    padded = padded.reshape(blocks, window)
+    prefix = np.maximum.accumulate(padded, axis=1).ravel()
+    suffix = np.maximum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    ends = np.arange(window - 1, window - 1 + n)
+    return np.maximum(suffix[ends - window + 1], prefix[ends])
+
+
+class LoadProfile:
+    # Everything the peak demand section shows for a region and a year, from the consumption at every quarter-hour
+    def __init__(self, curve):
+        dates = curve.index
+        load = curve.to_numpy(dtype='float64')
+        # Positions on the quarter-hours from the first one: missing quarter-hours are left out of the windows
+        positions = (dates.asi8 - dates.asi8[0]) // quarter_hour.value
+        grid = np.full(positions[-1] + 1, -np.inf)
+        grid[positions] = load
+
+        self.load = load
+        # The load-duration curve read backwards
+        self.sorted = np.sort(load)
+        self.peak = self.sorted[-1]
+        self.peak_date = dates[load.argmax()]
+        self.percentiles = pd.Series({name: self.quantile(level) for name, level in percentile_levels.items()} | {'max': self.peak})
+        self.rolling = pd.DataFrame(
+            {name: rolling_max(grid, window)[positions] for name, window in rolling_windows.items()},
+            index=dates,
+        )
+
+        # Hours during which the load is at least the value, from the highest load
+        ranks = np.unique(np.linspace(0, len(load) - 1, min(curve_points, len(load))).astype(np.int64))
+        self.duration_curve = pd.DataFrame(
+            {'consommation': self.sorted[::-1][ranks]},
+            index=pd.Index((ranks + 1) * quarter_hour / pd.Timedelta(hours=1), name='hours'),
+        )
+
+    def quantile(self, level):
+        # Linear interpolation between the closest ranks, like np.quantile
+        rank = level * (len(self.sorted) - 1)
+        low = int(rank)
+        high = min(low + 1, len(self.sorted) - 1)
+        return self.sorted[low] + (self.sorted[high] - self.sorted[low]) * (rank - low)
+
+    def top_peaks(self, count):
+        # The count quarter-hours with the highest load, highest first
+        count = min(count, len(self.load))
+        top = np.argpartition(self.load, len(self.load) - count)[len(self.load) - count:]
+        top = top[np.argsort(-self.load[top], kind='stable')]
+        return pd.DataFrame({'date': self.rolling.index[top], 'consommation': self.load[top]})
+
+    def hours_above(self, threshold):
+        # Hours and share of the quarter-hours with a load above threshold
+        above = len(self.sorted) - np.searchsorted(self.sorted, threshold, side='right')
+        return above * quarter_hour / pd.Timedelta(hours=1), above / len(self.sorted)
+
+
+@profiled(cache=eco2mix.query_cache)
+def get_load_profile(version, choice_region, year):
+    # None when the region has no consumption that year
+    curve = eco2mix.get_dataset(version).load_curve(year, choice_region)
+    if not len(curve):
+        return None
+    return LoadProfile(curve)
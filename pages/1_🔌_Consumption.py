@@ -1,20 +1,28 @@
 import streamlit as st
 from utils import *
+from downsampling import downsample, line_budget
 
-df, df_by_day = load_data()
+version = load_data()
 
 st_category('Consumption')
 
+kpis = get_dataset(version).kpi_summary.loc[Region.ALL_REGION]
+
 col1, col2 = st.columns(2)
-col1.metric(label="Total consumption today", value=format_watts(total_consumption_today(df)), delta=format_watts(total_consumption_today(df) - total_consumption_yesterday(df)))
-col2.metric(label="Total consumption this year", value=format_watts(total_consumption_this_year(df)), delta=format_watts(total_consumption_this_year(df) - total_consumption_last_year(df)))
+col1.metric(label="Total consumption today", value=format_watts(kpis['today', 'consommation']), delta=format_watts(kpis['today', 'consommation'] - kpis['yesterday', 'consommation']))
+col2.metric(label="Total consumption this year", value=format_watts(kpis['this_year', 'consommation']), delta=format_watts(kpis['this_year', 'consommation'] - kpis['last_year', 'consommation']))
 
 st_graph_title('Consumption of electricity in France over time')
 
 choice_period = make_time_period_selector()
-choice_region = st.selectbox('Select a region', get_region_list(df), key="consumption_region")
+choice_region = st.selectbox('Select a region', get_region_list(version), key="consumption_region")
 
-st.line_chart(get_consumption_data(df, df_by_day, choice_period, choice_region))
+if st.toggle('Compare years', key="consumption_compare"):
+    st_year_comparison(version, choice_region, 'consommation', key="consumption_compare")
+else:
+    consumption = downsample(get_consumption_data(version, choice_period, choice_region), line_budget)
+    with chart_lock:
+        st.line_chart(consumption)
 
 st.markdown("""
             We can see that the consumption of electricity in France is quite stable over time. We can also see
@@ -27,3 +35,37 @@ st.markdown("""
             Pays de la Loire, if we select the time period "Week", it is not possible to see the difference
             between day and night. On the other hand, for Île-de-France, the difference is very visible.
             """)
+
+st_graph_title('Peak demand')
+
+from load_analytics import get_load_profile
+
+col1, col2 = st.columns(2)
+peak_region = col1.selectbox('Select a region', get_region_list(version), key="peak_region")
+years = get_year_list()
+peak_year = col2.slider('Select a year', years[0], years[-1], years[-1], key="peak_year")
+profile = get_load_profile(version, peak_region, peak_year)
+
+if profile is None:
+    st.info(f'No consumption data for {peak_region} in {peak_year}.')
+else:
+    cols = st.columns(4)
+    cols[0].metric(label=f"Peak ({profile.peak_date.strftime('%d/%m %H:%M')} UTC)", value=format_watts(profile.peak))
+    for col, name in zip(cols[1:], ['p99', 'p95', 'p50']):
+        col.metric(label=f'{name} of the quarter-hours', value=format_watts(profile.percentiles[name]))
+
+    st.markdown('Load-duration curve: hours of the year during which the consumption is at least the value (MW)')
+    with chart_lock:
+        st.line_chart(profile.duration_curve)
+
+    threshold = st.slider('Threshold (MW)', 0, int(profile.peak), int(profile.percentiles['p90']), step=100, key="peak_threshold")
+    hours, share = profile.hours_above(threshold)
+    st.write(f'Above {format_watts(threshold)} during {hours:,.0f} hours, {share:.1%} of the year.')
+
+    st.markdown('Highest consumption over the last 24 hours and the last 7 days (MW)')
+    rolling = downsample(profile.rolling, line_budget, 'minmax')
+    with chart_lock:
+        st.line_chart(rolling)
+
+    st.markdown('Top 10 peak quarter-hours')
+    st.dataframe(profile.top_peaks(10), hide_index=True)
@@ -1,58 +1,49 @@
 import streamlit as st
-import altair as alt
-import plotly.express as px
 from utils import *
+from downsampling import downsample, line_budget, area_budget
 
-df, df_by_day = load_data()
-
-c_scale = alt.Scale(domain=list(color_scale_hex.keys()), range=list(color_scale_hex.values()))
+version = load_data()
 
 st_category('Production')
 
 choice_period = make_time_period_selector()
-choice_region = st.selectbox('Select a region', get_region_list(df), key="energy_region")
+choice_region = st.selectbox('Select a region', get_region_list(version), key="energy_region")
 
-st_graph_title('Energy production over time')
+energy_mix = get_energy_mix(version, choice_period, choice_region, production_freqs[choice_period[0]])
 
-production_data = get_energy_sources_data(df, df_by_day, choice_period, choice_region) \
-    .groupby(['date']) \
-    .agg({'energy_value': 'sum'})
+st_graph_title('Energy production over time')
 
-st.line_chart(production_data)
+if st.toggle('Compare years', key="energy_compare"):
+    st_year_comparison(version, choice_region, 'production', key="energy_compare")
+else:
+    total = downsample(energy_mix.total, line_budget)
+    with chart_lock:
+        st.line_chart(total)
 
 st_graph_title('Energy distribution')
 
-production_data = get_energy_sources_data(df, df_by_day, choice_period, choice_region) \
-    .groupby(['energy_source']) \
-    .agg({'energy_value': 'sum'})
-
-st.bar_chart(production_data)
+with chart_lock:
+    st.bar_chart(energy_mix.source_totals)
 
 st_graph_title('Energy production distribution over time')
 
-energy_data = get_energy_sources_data(df, df_by_day, choice_period, choice_region)
+# Charting libraries are imported where the page first uses them
+import altair as alt
 
-if choice_period[0] == Period.WEEK:
-    energy_data = energy_data.groupby(['energy_source', pd.Grouper(key='date', freq='15min')])
-elif choice_period[0] == Period.MONTH:
-    energy_data = energy_data.groupby(['energy_source', pd.Grouper(key='date', freq='6H')])
-elif choice_period[0] == Period.YEAR:
-    energy_data = energy_data.groupby(['energy_source', pd.Grouper(key='date', freq='1D')])
-else:
-    energy_data = energy_data.groupby(['energy_source', pd.Grouper(key='date', freq='15D')])
+c_scale = alt.Scale(domain=list(color_scale_hex.keys()), range=list(color_scale_hex.values()))
 
-energy_data = energy_data \
-    .agg({'energy_value': 'sum'}) \
-    .reset_index()
+# One column per source, folded into (energy_source, energy_value) by Vega
+energy_data = downsample(energy_mix.stacked, area_budget).reset_index()
 
-chart = alt.Chart(energy_data).mark_area().encode(
+chart = alt.Chart(energy_data).transform_fold(source_columns, as_=['energy_source', 'energy_value']).mark_area().encode(
     x=alt.X('date:T', title='Date'),
-    y=alt.Y('sum(energy_value):Q', stack='zero', title='Energy (MW)'),
-    color=alt.Color('energy_source', scale=c_scale, title='Energy source'),
-    tooltip=[alt.Tooltip('date:T', title='Date'), alt.Tooltip('sum(energy_value):Q', title='Energy (MW)')],
+    y=alt.Y('energy_value:Q', stack='zero', title='Energy (MW)'),
+    color=alt.Color('energy_source:N', scale=c_scale, title='Energy source'),
+    tooltip=[alt.Tooltip('date:T', title='Date'), alt.Tooltip('energy_value:Q', title='Energy (MW)')],
 )
 
-st.altair_chart(chart, use_container_width=True)
+with chart_lock:
+    st.altair_chart(chart, use_container_width=True)
 
 st.markdown("""
             The graph above shows the distribution of energy sources over time. We can see that the nuclear
@@ -74,35 +65,32 @@ st_graph_title('Energy sources distribution over a given period')
 c_scale = alt.Scale(domain=list([*color_scale_hex.keys(), 'propre', 'sale']), range=list([*color_scale_hex.values(), '#00ff00', '#ff0000']))
 
 
-energy_chart = alt.Chart(energy_data).mark_arc().encode(
-    theta='sum(energy_value):Q',
+energy_chart = alt.Chart(energy_mix.source_totals.reset_index()).mark_arc().encode(
+    theta='energy_value:Q',
     color=alt.Color('energy_source', scale=c_scale, title='Energy source'),
     tooltip=[
         alt.Tooltip('energy_source', title=" "),
-        alt.Tooltip('sum(energy_value):Q', title='Energy (MW)')
+        alt.Tooltip('energy_value:Q', title='Energy (MW)')
     ],
 ).properties(
     width=300,
     height=300
 )
 
-clean_dirty_energy_data = energy_data.copy()
-clean_dirty_energy_data['energy_source'] = clean_dirty_energy_data['energy_source'].replace(['eolien', 'solaire', 'hydraulique', 'bioenergies'], 'propre')
-clean_dirty_energy_data['energy_source'] = clean_dirty_energy_data['energy_source'].replace(['thermique'], 'sale')
-
-clean_dirty_energy_chart = alt.Chart(clean_dirty_energy_data).mark_arc().encode(
-    theta='sum(energy_value):Q',
+clean_dirty_energy_chart = alt.Chart(energy_mix.group_totals.reset_index()).mark_arc().encode(
+    theta='energy_value:Q',
     color=alt.Color('energy_source', scale=c_scale, title='Energy source'),
     tooltip=[
         alt.Tooltip('energy_source', title=" "),
-        alt.Tooltip('sum(energy_value):Q', title='Energy (MW)'),
+        alt.Tooltip('energy_value:Q', title='Energy (MW)'),
     ],
 ).properties(
     width=300,
     height=300
 )
 
-st.altair_chart(energy_chart | clean_dirty_energy_chart)
+with chart_lock:
+    st.altair_chart(energy_chart | clean_dirty_energy_chart)
 
 st.markdown("""
             This two pie charts show the distribution of energy sources over a given period in France. The first
@@ -120,15 +108,9 @@ st.markdown("""
 
 st_graph_title('Production of energy sources per region over a given period')
 
-energy_sources_heatmap_data = get_energy_sources_data_with_region(df, df_by_day, choice_period, choice_region)
-energy_sources_heatmap_data = energy_sources_heatmap_data.groupby(['libelle_region']).agg({
-    'thermique': 'sum',
-    'nucleaire': 'sum',
-    'eolien': 'sum',
-    'solaire': 'sum',
-    'hydraulique': 'sum',
-    'bioenergies': 'sum',
-})
+energy_sources_heatmap_data = energy_mix.by_region
+
+import plotly.express as px
 
 tab1, tab2 = st.tabs(['All data', 'Without nuclear'])
 
@@ -1,8 +1,7 @@
 import streamlit as st
-import pydeck as pdk
 from utils import *
 
-df, df_by_day = load_data()
+version = load_data()
 
 st_category('Map')
 
@@ -10,21 +9,7 @@ st_graph_title('Map of energy sources per region')
 
 choice_period = make_time_period_selector()
 
-sources_data = get_energy_sources_data_with_region(df, df_by_day, choice_period, Region.ALL_REGION) \
-    .groupby('libelle_region') \
-    .agg({
-        "thermique": "sum",
-        "nucleaire": "sum",
-        "eolien": "sum",
-        "solaire": "sum",
-        "hydraulique": "sum",
-        "bioenergies": "sum",
-    }) \
-    .join(region_coordinates, on='libelle_region') \
-    .reset_index()
-
-for energy_type in ['thermique', 'nucleaire', 'eolien', 'solaire', 'hydraulique', 'bioenergies']:
-    sources_data[energy_type] = sources_data.groupby('libelle_region')[energy_type].cumsum()
+map_data = get_map_data(version, choice_period)
 
 scale_dynamically = st.toggle('Scale dynamically', value=False, help="""
                               If you scale dynamically, the columns will be scaled to fit into the screen, without any
@@ -42,17 +27,23 @@ def scale_factor():
         return 0.005
     return 0.0008
 
-chart_layers = [pdk.Layer(
+# Imported once the selectors are drawn
+import pydeck as pdk
+
+elevation_scale = scale_factor()
+
+# One layer draws every source: each column starts at the top of the sources below it (the z of its position)
+chart_layer = pdk.Layer(
     'ColumnLayer',
-    data=sources_data,
-    get_position=['lon', 'lat'],
-    get_elevation=energy_type,
-    elevation_scale=scale_factor(),
-    get_fill_color=color_scale_rgb[energy_type],
+    data=map_data,
+    get_position=f'[lon, lat, base * {elevation_scale}]',
+    get_elevation='value',
+    elevation_scale=elevation_scale,
+    get_fill_color='color',
     radius=20000,
     pickable=False,
     auto_highlight=False,
-) for energy_type in ['thermique', 'nucleaire', 'eolien', 'solaire', 'hydraulique', 'bioenergies']]
+)
 
 st.pydeck_chart(pdk.Deck(
     map_style='',
@@ -63,7 +54,7 @@ st.pydeck_chart(pdk.Deck(
         pitch=30,
     ),
     layers=[
-        *chart_layers,
+        chart_layer,
         pdk.Layer(
             'ScatterplotLayer',
             data=npp_coordinates,
@@ -1,54 +1,51 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
 from utils import *
+from downsampling import downsample, bar_budget
 
-df, df_by_day = load_data()
+version = load_data()
 
 st_category('Exchanges')
 
 @st.cache_data()
-def render_metrics():
-    exch_today = int(total_exchanges_today(df))
-    exch_yesterday = int(total_exchanges_yesterday(df))
+def render_metrics(version):
+    kpis = get_dataset(version).kpi_summary.loc[Region.ALL_REGION]
+    exch_today = int(kpis['today', 'ech_physiques'])
+    exch_yesterday = int(kpis['yesterday', 'ech_physiques'])
 
     col1, col2 = st.columns(2)
     col1.metric(label=f"Total export today", value=format_watts(abs(min(exch_today, 0))), delta=format_watts(abs(min(exch_today - exch_yesterday, 0))))
     col2.metric(label=f"Total import today", value=format_watts(max(exch_today, 0)), delta=format_watts(max(exch_today - exch_yesterday, 0)))
 
-render_metrics()
+render_metrics(version)
 
 st_graph_title('Energy exchanges with neighboring countries over time')
 
 choice_period = make_time_period_selector()
 
-exchange_data = get_exchange_data(df, df_by_day, choice_period, Region.ALL_REGION)
-
-if choice_period[0] == Period.WEEK:
-    exchange_data = exchange_data.groupby(pd.Grouper(key='date', freq='6H'))
-elif choice_period[0] == Period.MONTH:
-    exchange_data = exchange_data.groupby(pd.Grouper(key='date', freq='D'))
-elif choice_period[0] == Period.YEAR:
-    exchange_data = exchange_data.groupby(pd.Grouper(key='date', freq='3D'))
+if st.toggle('Compare years', key="exchanges_compare"):
+    st_year_comparison(version, Region.ALL_REGION, 'ech_physiques', key="exchanges_compare")
 else:
-    exchange_data = exchange_data.groupby(pd.Grouper(key='date', freq='M'))
-
-exchange_data_agg = exchange_data \
-    .agg({'ech_physiques': 'sum'}) \
-    .reset_index()
-
-color_scale = alt.Scale(
-    domain=[-20_000_000, 0, 20_000_000],  # Define the color transitions at -50, 0, and 50
-    range=['green', 'white', 'red']  # Define the colors for negative, zero, and positive values
-)
-
-chart = alt.Chart(exchange_data_agg).mark_bar().encode(
-    x=alt.X('date:T', title='Date'),
-    y=alt.Y('ech_physiques:Q', title='Exchanges (MW)'),
-    # Shade of green if negative (lighter the closer to 0, darker the more negative), red if positive (lighter the closer to 0, darker the more positive)
-    color=alt.Color('ech_physiques:Q', scale=color_scale, title='Exchanges (MW)'),
-    tooltip=[alt.Tooltip('date:T', title='Date'), alt.Tooltip('ech_physiques:Q', title='Exchanges (MW)')],
-)
-
-st.altair_chart(chart, use_container_width=True)
+    # Bars are already bins of the frequency, min/max keeps the largest imports and exports if there are too many
+    exchange_data_agg = downsample(get_rollup(version, choice_period, Region.ALL_REGION, exchanges_freqs[choice_period[0]])[['ech_physiques']], bar_budget, 'minmax') \
+        .reset_index()
+
+    # Imported once the metrics and the selector are drawn
+    import altair as alt
+
+    color_scale = alt.Scale(
+        domain=[-20_000_000, 0, 20_000_000],  # Define the color transitions at -50, 0, and 50
+        range=['green', 'white', 'red']  # Define the colors for negative, zero, and positive values
+    )
+
+    chart = alt.Chart(exchange_data_agg).mark_bar().encode(
+        x=alt.X('date:T', title='Date'),
+        y=alt.Y('ech_physiques:Q', title='Exchanges (MW)'),
+        # Shade of green if negative (lighter the closer to 0, darker the more negative), red if positive (lighter the closer to 0, darker the more positive)
+        color=alt.Color('ech_physiques:Q', scale=color_scale, title='Exchanges (MW)'),
+        tooltip=[alt.Tooltip('date:T', title='Date'), alt.Tooltip('ech_physiques:Q', title='Exchanges (MW)')],
+    )
+
+    with chart_lock:
+        st.altair_chart(chart, use_container_width=True)
+
 st.write("Exporter if negative, importer if positive")
@@ -0,0 +1,102 @@
+# Computes the queries behind every view the pages can show, for every (period, region) their selectors produce,
+# in a pool of processes, and saves the results next to the data (eco2mix.DATA_PREWARM). The app preloads them
+# with the dataset they were computed from, so that no visitor waits for a cold view; they are ignored once the
+# dataset changes. Run it after fix_files.py, or whenever the real-time export is replaced:
+#
+#   python prewarm.py --workers 4 --report prewarm.csv
+
+import argparse
+import concurrent.futures
+import os
+import pickle
+import time
+
+import pandas as pd
+
+import eco2mix
+
+
+def views(version):
+    # (function name, args) of the queries of each page, as the pages call them
+    periods = [(eco2mix.Period.WEEK, None), (eco2mix.Period.MONTH, None)]
+    periods += [(eco2mix.Period.YEAR, year) for year in eco2mix.get_year_list()]
+    periods += [(eco2mix.Period.ALL_TIME, None)]
+    regions = eco2mix.get_region_list(version)
+
+    for period in periods:
+        for region in regions:
+            yield 'get_consumption_data', (version, period, region)
+            yield 'get_energy_mix', (version, period, region, eco2mix.production_freqs[period[0]])
+        yield 'get_rollup', (version, period, eco2mix.Region.ALL_REGION, eco2mix.exchanges_freqs[period[0]])
+        yield 'get_map_data', (version, period)
+
+
+def start_worker():
+    eco2mix.profiling.enabled = False
+    # Every view is computed from the dataset, so that its cost doesn't depend on what the worker ran before
+    eco2mix.query_cache.use(None)
+    eco2mix.load_data()
+
+
+def compute(name, args):
+    start = time.perf_counter()
+    result = getattr(eco2mix, name)(*args)
+    return result, time.perf_counter() - start
+
+
+def save(version, results):
+    # Written aside then renamed: a running app never reads a partial file
+    path = eco2mix.DATA_PREWARM + '.tmp'
+    with open(path, 'wb') as prewarm_file:
+        pickle.dump((eco2mix.prewarm_format, version), prewarm_file)
+        pickle.dump(results, prewarm_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path, eco2mix.DATA_PREWARM)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--report', help='also write the cost of every view to a CSV file')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    eco2mix.profiling.enabled = False
+    version = eco2mix.load_data()
+    load_s = time.perf_counter() - start
+
+    results, costs = {}, []
+    with concurrent.futures.ProcessPoolExecutor(args.workers, initializer=start_worker) as pool:
+        futures = {pool.submit(compute, name, view_args): (name, view_args) for name, view_args in views(version)}
+        for future in concurrent.futures.as_completed(futures):
+            name, view_args = futures[future]
+            results[name, view_args], cost_s = future.result()
+            period, year = view_args[1]
+            region = view_args[2] if len(view_args) > 2 else None
+            costs.append({'function': name, 'period': period, 'year': year, 'region': region, 'cost_s': cost_s})
+
+    save(version, results)
+    warm_s = time.perf_counter() - start
+
+    costs = pd.DataFrame(costs)
+    by_view = costs.groupby(['function', 'period'])['cost_s']
+    summary = pd.DataFrame({
+        'views': by_view.size(),
+        'p50_ms': by_view.median() * 1000,
+        'max_ms': by_view.max() * 1000,
+        'total_s': by_view.sum(),
+    })
+    with pd.option_context('display.width', 200, 'display.float_format', '{:.2f}'.format):
+        print(summary)
+        print('\nSlowest views')
+        print(costs.sort_values('cost_s', ascending=False).head(10).to_string(index=False))
+
+    print(f'\n{len(results)} views of {version} warmed in {warm_s:.1f}s with {args.workers} workers '
+          f'(load {load_s:.1f}s, views {costs["cost_s"].sum():.1f}s summed), '
+          f'{os.path.getsize(eco2mix.DATA_PREWARM) / 1024 ** 2:.1f} MB in {eco2mix.DATA_PREWARM}')
+
+    if args.report:
+        costs.to_csv(args.report, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+# Spans of the data functions of eco2mix, written to profile.csv in batches:
+#   - spans nest (get_energy_sources_data -> get_energy_sources_data_with_region -> ...) through a per-thread stack,
+#   - cached functions are tagged hit or miss depending on whether their body ran,
+#   - rows_out is the length of the result, rows_in what the function reported with add_rows_in,
+#   - session is the Streamlit session that triggered the call.
+# When disabled, a profiled call costs one global lookup.
+#
+#   ECO2MIX_PROFILE=0 streamlit run 0_🏠_Home.py   # disable
+#   python profiling.py profile.csv                 # p50/p95/p99 per function
+
+import atexit
+import datetime
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+
+enabled = os.environ.get('ECO2MIX_PROFILE', '1') == '1'
+filename = 'profile.csv'
+# Records kept in memory before they are appended to filename
+buffer_size = 256
+
+columns = ['timestamp', 'session', 'span', 'parent', 'depth', 'function', 'cache', 'rows_in', 'rows_out', 'time_s']
+
+span_ids = itertools.count(1)
+local = threading.local()
+records = []
+records_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, parent):
+        self.id = next(span_ids)
+        self.name = name
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.session = parent.session if parent else session_id()
+        self.cache = ''
+        self.rows_in = None
+
+
+def session_id():
+    # Streamlit is not imported here: it is loaded by the app only, see utils
+    scriptrunner = sys.modules.get('streamlit.runtime.scriptrunner')
+    ctx = scriptrunner.get_script_run_ctx(suppress_warning=True) if scriptrunner else None
+    return ctx.session_id if ctx else threading.current_thread().name
+
+
+def current_span():
+    stack = getattr(local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def add_rows_in(count):
+    # Rows read by the current span, e.g. the rows of the dataset it sliced
+    span = current_span() if enabled else None
+    if span is not None:
+        span.rows_in = (span.rows_in or 0) + count
+
+
+def row_count(result):
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def record(span, rows_out, elapsed):
+    timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+    row = [timestamp, span.session, span.id, span.parent.id if span.parent else '', span.depth, span.name,
+           span.cache, span.rows_in, rows_out, f'{elapsed:.6f}']
+    with records_lock:
+        records.append(row)
+        if len(records) >= buffer_size:
+            flush_locked()
+
+
+def flush_locked():
+    global records
+    if not records:
+        return
+    new_file = not os.path.exists(filename)
+    with open(filename, 'a') as log_file:
+        if new_file:
+            log_file.write(','.join(columns) + '\n')
+        log_file.writelines(','.join('' if value is None else str(value) for value in row) + '\n' for row in records)
+    records = []
+
+
+def flush():
+    with records_lock:
+        flush_locked()
+
+
+atexit.register(flush)
+
+
+def profiled(cache=None):
+    # Use instead of stacking a timing decorator on a cache, e.g. @profiled(cache=query_cache).
+    # The cache wraps a marker around the body, so a span whose body did not run was a cache hit.
+    def decorator(func):
+        body = func
+        if cache is not None:
+            @functools.wraps(func)
+            def miss(*args, **kwargs):
+                span = current_span() if enabled else None
+                if span is not None:
+                    span.cache = 'miss'
+                return func(*args, **kwargs)
+
+            body = cache(miss)
+
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            if not enabled:
+                return body(*args, **kwargs)
+
+            stack = getattr(local, 'stack', None)
+            if stack is None:
+                stack = local.stack = []
+            span = Span(func.__name__, stack[-1] if stack else None)
+            if cache is not None:
+                span.cache = 'hit'
+
+            stack.append(span)
+            start = time.perf_counter()
+            try:
+                result = body(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                stack.pop()
+            record(span, row_count(result), elapsed)
+            return result
+
+        if cache is not None:
+            # Keep the cache controls of the cached body reachable, e.g. get_rollup.clear()
+            wrapped.clear = body.clear
+        return wrapped
+
+    return decorator
+
+
+def summary(path=filename):
+    # Calls, cache hit rate and latency percentiles (ms) per function
+    import pandas as pd
+
+    spans = pd.read_csv(path)
+    spans['ms'] = spans['time_s'] * 1000
+    by_function = spans.groupby('function')
+    result = pd.DataFrame({
+        'calls': by_function.size(),
+        'hit_rate': by_function['cache'].apply(lambda cache: (cache == 'hit').sum() / cache.notna().sum() if cache.notna().any() else None),
+        'rows_in': by_function['rows_in'].mean(),
+        'rows_out': by_function['rows_out'].mean(),
+        'p50_ms': by_function['ms'].quantile(0.50),
+        'p95_ms': by_function['ms'].quantile(0.95),
+        'p99_ms': by_function['ms'].quantile(0.99),
+        'total_ms': by_function['ms'].sum(),
+    })
+    return result.sort_values('total_ms', ascending=False)
+
+
+if __name__ == '__main__':
+    import pandas as pd
+
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.2f}'.format):
+        print(summary(sys.argv[1] if len(sys.argv) > 1 else filename))
@@ -0,0 +1,178 @@
+# Query backend running the queries of eco2mix.Dataset as SQL on the Parquet snapshot with DuckDB, selected with
+# ECO2MIX_BACKEND=duckdb. Region and time filters are pushed down to the Parquet row groups and only the columns
+# a query reads are decoded, so memory doesn't grow with the history. Requires `pip install duckdb`.
+#
+# The snapshot stores epoch seconds: date_heure is the quarter-hour in UTC, date the local day at UTC midnight.
+
+import threading
+
+import duckdb
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import MonthEnd, Tick
+
+from eco2mix import Period, Region, measure_columns, period_range, rollup_source, kpi_windows, day_end, to_datetime, dataset_columns
+
+sums = ', '.join(f'SUM({column})::BIGINT AS {column}' for column in measure_columns)
+
+
+def epoch_seconds(timestamp):
+    return timestamp.value // 10**9
+
+
+def epoch_seconds_column(column):
+    return (column - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+
+
+def bucket_expression(freq, column):
+    # Bins of freq labelled like pandas resampling: Tick bins start at the midnight before the first row
+    # (origin, see SqlDataset.rollup), month bins are labelled with their last day
+    if freq is None:
+        return column
+    offset = to_offset(freq)
+    if isinstance(offset, Tick):
+        width = offset.nanos // 10**9
+        return f'origin + ({column} - origin) // {width} * {width}'
+    if isinstance(offset, MonthEnd) and offset.n == 1:
+        return f'epoch(last_day(make_timestamp({column} * 1000000)))::BIGINT'
+    raise ValueError(f'Unsupported frequency {freq}')
+
+
+class SqlDataset:
+    # Same interface as eco2mix.Dataset, without the frames
+    def __init__(self, version, path, last_day, appended=None):
+        self.version = version
+        self.path = path
+        self.connection = duckdb.connect()
+        self.lock = threading.Lock()
+
+        # Rows of the real-time exports appended since the snapshot, in the layout of the snapshot
+        self.appended = appended
+        source = f"read_parquet('{path}')"
+        if appended is not None:
+            # A table rather than a registered frame, which the cursors of other threads can't see
+            self.connection.register('appended_frame', appended)
+            self.connection.execute('CREATE TABLE appended AS SELECT * FROM appended_frame')
+            self.connection.unregister('appended_frame')
+            source = f'(SELECT * FROM {source} UNION ALL BY NAME SELECT * FROM appended)'
+        self.connection.execute(f'CREATE VIEW eco2mix AS SELECT * FROM {source}')
+
+        # Up to last_day like Dataset, from the UTC day of the last quarter-hour
+        data_last_day = pd.Timestamp(self.query('SELECT MAX(date_heure) AS date_heure FROM eco2mix')['date_heure'].iloc[0], unit='s').date()
+        self.last_day = min(last_day, data_last_day)
+        self.cut = epoch_seconds(day_end(self.last_day))
+
+        self.regions = sorted(self.query(f'SELECT DISTINCT libelle_region FROM eco2mix WHERE date_heure < {self.cut}')['libelle_region'])
+        self.kpi_summary = self.build_kpi_summary()
+
+    def query(self, sql, parameters=None):
+        # One cursor per query: the connection is shared by every session thread
+        with self.lock:
+            cursor = self.connection.cursor()
+        return cursor.execute(sql, parameters or []).df()
+
+    def where(self, choice_period, choice_region, column):
+        # Filters and parameters of the rows of a period and a region, before the cut like Dataset
+        start, end = period_range(choice_period, self.last_day)
+        conditions, parameters = [f'{column} < {self.cut}'], []
+        if start is not None:
+            conditions.append(f'{column} >= ?')
+            parameters.append(epoch_seconds(start))
+        if end is not None:
+            conditions.append(f'{column} < ?')
+            parameters.append(epoch_seconds(end))
+        if choice_region != Region.ALL_REGION:
+            conditions.append('libelle_region = ?')
+            parameters.append(choice_region)
+        return ' AND '.join(conditions), parameters
+
+    def build_kpi_summary(self):
+        windows = kpi_windows(self.last_day)
+        start = min(epoch_seconds(window_start) for window_start, _ in windows.values())
+        columns = ', '.join(
+            f'SUM({column}) FILTER (WHERE date_heure >= {epoch_seconds(window_start)} AND date_heure < {epoch_seconds(window_end)})::BIGINT'
+            f' AS "{name}:{column}"'
+            for name, (window_start, window_end) in windows.items() for column in measure_columns
+        )
+        summary = self.query(
+            f'SELECT libelle_region, {columns} FROM eco2mix WHERE date_heure >= {start} AND date_heure < {self.cut} '
+            f'GROUP BY libelle_region ORDER BY libelle_region'
+        ).set_index('libelle_region')
+        summary.columns = pd.MultiIndex.from_tuples([tuple(column.split(':')) for column in summary.columns])
+        summary = summary.fillna(0)
+        summary.loc[Region.ALL_REGION] = summary.sum()
+        return summary
+
+    def watermarks(self):
+        last = self.query(f'SELECT libelle_region, MAX(date_heure) AS date_heure FROM eco2mix WHERE date_heure < {self.cut} GROUP BY libelle_region')
+        return dict(zip(last['libelle_region'], pd.to_datetime(last['date_heure'], unit='s', utc=True)))
+
+    def append(self, rows, version):
+        # The new rows of the real-time export are kept in memory and queried together with the snapshot
+        rows = rows[dataset_columns]
+        date_heure = to_datetime(rows['date_heure'])
+        watermark = pd.to_datetime(rows['libelle_region'].map(self.watermarks()), utc=True)
+        keep = (watermark.isna() | (date_heure > watermark)).to_numpy()
+        if not keep.any():
+            return None
+
+        appended = pd.DataFrame({
+            'code_insee_region': rows['code_insee_region'].astype(str),
+            'libelle_region': rows['libelle_region'],
+            'date': epoch_seconds_column(to_datetime(rows['date'])),
+            'date_heure': epoch_seconds_column(date_heure),
+            **{column: rows[column].fillna(0).round().astype('int32') for column in measure_columns},
+        })[keep]
+        if self.appended is not None:
+            appended = pd.concat([self.appended, appended], ignore_index=True)
+
+        last_day = max(self.last_day, pd.Timestamp(appended['date_heure'].max(), unit='s').date())
+        return SqlDataset(version, self.path, last_day, appended)
+
+    def date_range(self):
+        dates = self.query(f'SELECT MIN(date_heure) AS first, MAX(date_heure) AS last FROM eco2mix WHERE date_heure < {self.cut}')
+        return pd.Timestamp(dates['first'].iloc[0], unit='s', tz='UTC'), pd.Timestamp(dates['last'].iloc[0], unit='s', tz='UTC')
+
+    def rows(self, choice_period, choice_region):
+        if rollup_source(choice_period) == 'raw':
+            where, parameters = self.where(choice_period, choice_region, 'date_heure')
+            sql = f'''
+                SELECT code_insee_region, libelle_region, date_heure AS date, {', '.join(measure_columns)}
+                FROM eco2mix WHERE {where} ORDER BY libelle_region, date
+            '''
+        else:
+            where, parameters = self.where(choice_period, choice_region, 'date')
+            sql = f'''
+                SELECT code_insee_region, libelle_region, date, {sums}
+                FROM eco2mix WHERE {where} GROUP BY code_insee_region, libelle_region, date ORDER BY libelle_region, date
+            '''
+        rows = self.query(sql, parameters)
+        rows['date'] = pd.to_datetime(rows['date'], unit='s', utc=True)
+        return rows
+
+    def rollup(self, choice_period, choice_region, freq=None):
+        column = 'date_heure' if rollup_source(choice_period) == 'raw' else 'date'
+        where, parameters = self.where(choice_period, choice_region, column)
+        rollup = self.query(f'''
+            WITH selection AS (SELECT {column}, {', '.join(measure_columns)} FROM eco2mix WHERE {where}),
+                 bounds AS (SELECT MIN({column}) // 86400 * 86400 AS origin FROM selection)
+            SELECT {bucket_expression(freq, column)} AS date, {sums}
+            FROM selection, bounds GROUP BY 1 ORDER BY 1
+        ''', parameters)
+        rollup['date'] = pd.to_datetime(rollup['date'], unit='s', utc=True)
+        return rollup.set_index('date')
+
+    def sums_by_region(self, choice_period, regions):
+        column = 'date_heure' if rollup_source(choice_period) == 'raw' else 'date'
+        where, parameters = self.where(choice_period, regions[0] if len(regions) == 1 else Region.ALL_REGION, column)
+        by_region = self.query(f'SELECT libelle_region, {sums} FROM eco2mix WHERE {where} GROUP BY libelle_region', parameters)
+        return by_region.set_index('libelle_region').reindex(pd.Index(regions, name='libelle_region'), fill_value=0)
+
+    def load_curve(self, year, choice_region):
+        where, parameters = self.where((Period.YEAR, year), choice_region, 'date_heure')
+        curve = self.query(f'''
+            SELECT date_heure AS date, SUM(consommation)::BIGINT AS consommation
+            FROM eco2mix WHERE {where} GROUP BY 1 ORDER BY 1
+        ''', parameters)
+        curve['date'] = pd.to_datetime(curve['date'], unit='s', utc=True)
+        return curve.set_index('date')['consommation']
@@ -0,0 +1,78 @@
+# Year-over-year comparisons of the daily measures: every measure of every region (and all regions) is laid out
+# once per dataset on a calendar aligned across years, indexed by (region, year, day or week of the year), so that
+# overlaying a set of years is an array lookup rather than a filter of the daily rows per year.
+#
+# Days are placed on a leap-year calendar: Feb 29 has its own slot, empty in common years, so that Mar 1 and every
+# later day are compared with the same date of the other years. Weeks are 7 slots of that calendar from Jan 1, the
+# 53rd holding Dec 30 and 31; they are the average day of the week, the 9th week of common years having 6 days.
+#
+#   calendar = year_over_year.get_calendar(eco2mix.load_data())
+#   calendar.compare(eco2mix.Region.ALL_REGION, [2021, 2022], 'consommation', 'week')
+
+import numpy as np
+import pandas as pd
+
+import eco2mix
+from eco2mix import Period, Region
+from profiling import profiled
+
+calendar_days = 366
+calendar_weeks = 53
+# The measures, and the sum of the sources
+calendar_measures = [*eco2mix.measure_columns, 'production']
+resolutions = ['day', 'week']
+
+
+def calendar_slots(dates):
+    # Day of the year from 0 on a leap-year calendar: Feb 29 is slot 59 and Mar 1 slot 60 in every year
+    day = dates.dayofyear.to_numpy() - 1
+    return day + ((~dates.is_leap_year) & (day >= 59))
+
+
+class Calendar:
+    # Daily values of shape (regions + all regions, years, 366, measures), NaN where there is no data
+    def __init__(self, rows, regions):
+        dates = pd.DatetimeIndex(rows['date'])
+        self.years = list(range(dates.year.min(), dates.year.max() + 1))
+        self.regions = {region: position for position, region in enumerate([*regions, Region.ALL_REGION])}
+
+        values = rows[eco2mix.measure_columns].to_numpy(dtype='float64')
+        values = np.column_stack([values, rows[eco2mix.source_columns].to_numpy(dtype='float64').sum(axis=1)])
+        daily = np.full((len(self.regions), len(self.years), calendar_days, len(calendar_measures)), np.nan)
+        daily[
+            pd.Index(regions).get_indexer(rows['libelle_region'].astype(str)),
+            dates.year.to_numpy() - self.years[0],
+            calendar_slots(dates),
+        ] = values
+        # All regions: the sum of the days at least one region has
+        daily[-1] = np.where(np.isnan(daily[:-1]).all(axis=0), np.nan, np.nansum(daily[:-1], axis=0))
+        self.daily = daily
+
+        weeks = np.full((*daily.shape[:2], calendar_weeks * 7, daily.shape[3]), np.nan)
+        weeks[:, :, :calendar_days] = daily
+        weeks = weeks.reshape(*daily.shape[:2], calendar_weeks, 7, daily.shape[3])
+        days = (~np.isnan(weeks)).sum(axis=3)
+        self.weekly = np.divide(np.nansum(weeks, axis=3), days, out=np.full(days.shape, np.nan), where=days > 0)
+
+        self.index = {
+            'day': pd.Index(np.arange(1, calendar_days + 1), name='day_of_year'),
+            'week': pd.Index(np.arange(1, calendar_weeks + 1), name='week_of_year'),
+        }
+
+    def compare(self, choice_region, years, measure, resolution='day'):
+        # One column per year, one row per day or week of the calendar
+        values = self.daily if resolution == 'day' else self.weekly
+        years = [year for year in years if self.years[0] <= year <= self.years[-1]]
+        selected = values[self.regions[choice_region], [year - self.years[0] for year in years], :, calendar_measures.index(measure)]
+        return pd.DataFrame(selected.T, index=self.index[resolution], columns=[str(year) for year in years])
+
+
+@profiled(cache=eco2mix.query_cache)
+def get_calendar(version):
+    dataset = eco2mix.get_dataset(version)
+    return Calendar(dataset.rows((Period.ALL_TIME, None), Region.ALL_REGION), dataset.regions)
+
+
+def get_year_comparison(version, choice_region, years, measure, resolution='day'):
+    # Not cached: a lookup in the calendar of the dataset
+    return get_calendar(version).compare(choice_region, years, measure, resolution)